@@ -1,6 +1,7 @@
 import React, { useEffect, useRef, useState } from "react";
 import ChatMessage from "./ChatMessage";
 import ChatInput from "./ChatInput";
+import { GameSocket, GAME_SOCKET_ENABLED } from "../gameSocket";
 
 const CONTEXT_WINDOW_SIZE = 999;
 const LOCAL_STORAGE_CONTEXT_KEY = "world_saver_chat_context_v1";
@@ -59,6 +60,8 @@ export default function ChatApp() {
   const chatBoxRef = useRef(null);
   const fetchControllerRef = useRef(null);
   const mountedRef = useRef(true);
+  // set when this game is played over the WebSocket; games resumed from localStorage use HTTP
+  const socketRef = useRef(null);
 
   const [score, setScore] = useState(0);
 
@@ -92,6 +95,10 @@ export default function ChatApp() {
         } catch {}
         fetchControllerRef.current = null;
       }
+      if (socketRef.current) {
+        socketRef.current.close();
+        socketRef.current = null;
+      }
     };
   }, []);
 
@@ -110,27 +117,44 @@ export default function ChatApp() {
       fetchControllerRef.current = controller;
 
       try {
-        const payload = { username };
-        const resp = await fetch("http://localhost:5000/api/first-message", {
-          method: "POST",
-          headers: { "Content-Type": "application/json" },
-          body: JSON.stringify(payload),
-          signal: controller.signal,
-        });
-
-        if (!resp.ok) throw new Error(`HTTP ${resp.status}`);
+        let story = null;
+        let sentimentValue = 0;
+
+        if (GAME_SOCKET_ENABLED) {
+          const socket = new GameSocket();
+          try {
+            await socket.connect();
+            story = await socket.start(username);
+            socketRef.current = socket;
+          } catch (err) {
+            socket.close();
+            console.warn("WebSocket unavailable, using HTTP:", err);
+          }
+        }
 
-        const j = await resp.json();
-        const story =
-          typeof j.story === "string"
-            ? j.story
-            : typeof j.text === "string"
-            ? j.text
-            : null;
-        const sentimentValue =
-          j && (j.sentiment ?? j.score) != null
-            ? Number(j.sentiment ?? j.score)
-            : 0;
+        if (story === null) {
+          const payload = { username };
+          const resp = await fetch("http://localhost:5000/api/first-message", {
+            method: "POST",
+            headers: { "Content-Type": "application/json" },
+            body: JSON.stringify(payload),
+            signal: controller.signal,
+          });
+
+          if (!resp.ok) throw new Error(`HTTP ${resp.status}`);
+
+          const j = await resp.json();
+          story =
+            typeof j.story === "string"
+              ? j.story
+              : typeof j.text === "string"
+              ? j.text
+              : null;
+          sentimentValue =
+            j && (j.sentiment ?? j.score) != null
+              ? Number(j.sentiment ?? j.score)
+              : 0;
+        }
 
         // Append a single bot placeholder with sentiment (streamBotMessage will reuse it)
         setMessages((prev) => [
@@ -246,41 +270,54 @@ export default function ChatApp() {
     fetchControllerRef.current = controller;
 
     try {
-      const resp = await fetch("http://localhost:5000/api/submit-action", {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify(payload),
-        signal: controller.signal,
-      });
-
-      if (!resp.ok) throw new Error(`HTTP ${resp.status}`);
-
-      const ct = resp.headers.get("content-type") || "";
       let responseText = "";
       let sentimentValue = null;
+      let endingStory = null; // streamed by the server when the turn ends the game
+      const socket = socketRef.current;
+
+      if (socket && socket.connected) {
+        const { turn, ending } = await socket.action(userText);
+        responseText = turn.story ?? "";
+        sentimentValue = turn.sentiment != null ? Number(turn.sentiment) : null;
+
+        const extraScore = turn.scoreDelta != null ? Number(turn.scoreDelta) : 0;
+        tempScore += extraScore;
+        setScore((cur) => cur + extraScore);
+        if (ending) endingStory = ending.story;
+      } else {
+        const resp = await fetch("http://localhost:5000/api/submit-action", {
+          method: "POST",
+          headers: { "Content-Type": "application/json" },
+          body: JSON.stringify(payload),
+          signal: controller.signal,
+        });
 
-      if (ct.includes("application/json")) {
-        const j = await resp.json();
-        if (j && typeof j === "object") {
-          responseText = j.story ?? j.text ?? j.output ?? "";
-          console.log(j);
-          // parse sentiment/score delta
-          sentimentValue =
-            j.sentiment != null
-              ? Number(j.sentiment)
-              : j.scoreDelta != null
-              ? Number(j.scoreDelta)
-              : null;
+        if (!resp.ok) throw new Error(`HTTP ${resp.status}`);
 
-          const extraScore =
-            j && j.scoreDelta != null ? Number(j.scoreDelta) : 0;
-          tempScore += extraScore;
-          setScore((cur) => cur + extraScore);
-        } else if (typeof j === "string") {
-          responseText = j;
+        const ct = resp.headers.get("content-type") || "";
+        if (ct.includes("application/json")) {
+          const j = await resp.json();
+          if (j && typeof j === "object") {
+            responseText = j.story ?? j.text ?? j.output ?? "";
+            console.log(j);
+            // parse sentiment/score delta
+            sentimentValue =
+              j.sentiment != null
+                ? Number(j.sentiment)
+                : j.scoreDelta != null
+                ? Number(j.scoreDelta)
+                : null;
+
+            const extraScore =
+              j && j.scoreDelta != null ? Number(j.scoreDelta) : 0;
+            tempScore += extraScore;
+            setScore((cur) => cur + extraScore);
+          } else if (typeof j === "string") {
+            responseText = j;
+          }
+        } else {
+          responseText = await resp.text();
         }
-      } else {
-        responseText = await resp.text();
       }
       const previouscontext = buildApiConversationPayload(
         contextIncludingThisAction
@@ -295,55 +332,63 @@ export default function ChatApp() {
         setGameOver(true);
 
         // request extra win description (optional - you already do this)
-        try {
-          const payload2 = {
-            username,
-            previouscontext,
-            action: userText,
-            score: tempScore,
-          };
-
-          const resp2 = await fetch(
-            "http://localhost:5000/api/generate-win-description",
-            {
-              method: "POST",
-              headers: { "Content-Type": "application/json" },
-              body: JSON.stringify(payload2),
-              signal: controller.signal,
-            }
-          );
-          if (!resp2.ok) throw new Error(`HTTP ${resp2.status}`);
-          const j2 = await resp2.json();
-          responseText = j2.story ?? j2.text ?? responseText;
-        } catch (e) {
-          console.warn("Failed to fetch win description:", e);
+        if (endingStory !== null) {
+          responseText = endingStory;
+        } else {
+          try {
+            const payload2 = {
+              username,
+              previouscontext,
+              action: userText,
+              score: tempScore,
+            };
+
+            const resp2 = await fetch(
+              "http://localhost:5000/api/generate-win-description",
+              {
+                method: "POST",
+                headers: { "Content-Type": "application/json" },
+                body: JSON.stringify(payload2),
+                signal: controller.signal,
+              }
+            );
+            if (!resp2.ok) throw new Error(`HTTP ${resp2.status}`);
+            const j2 = await resp2.json();
+            responseText = j2.story ?? j2.text ?? responseText;
+          } catch (e) {
+            console.warn("Failed to fetch win description:", e);
+          }
         }
       } else if (tempScore <= LOSING_SCORE) {
         finalResult = "lose";
         setGameResult("lose");
         setGameOver(true);
-        try {
-          const payload2 = {
-            username,
-            previouscontext,
-            action: userText,
-            score: tempScore,
-          };
-
-          const resp2 = await fetch(
-            "http://localhost:5000/api/generate-lose-description",
-            {
-              method: "POST",
-              headers: { "Content-Type": "application/json" },
-              body: JSON.stringify(payload2),
-              signal: controller.signal,
-            }
-          );
-          if (!resp2.ok) throw new Error(`HTTP ${resp2.status}`);
-          const j2 = await resp2.json();
-          responseText = j2.story ?? j2.text ?? responseText;
-        } catch (e) {
-          console.warn("Failed to fetch lose description:", e);
+        if (endingStory !== null) {
+          responseText = endingStory;
+        } else {
+          try {
+            const payload2 = {
+              username,
+              previouscontext,
+              action: userText,
+              score: tempScore,
+            };
+
+            const resp2 = await fetch(
+              "http://localhost:5000/api/generate-lose-description",
+              {
+                method: "POST",
+                headers: { "Content-Type": "application/json" },
+                body: JSON.stringify(payload2),
+                signal: controller.signal,
+              }
+            );
+            if (!resp2.ok) throw new Error(`HTTP ${resp2.status}`);
+            const j2 = await resp2.json();
+            responseText = j2.story ?? j2.text ?? responseText;
+          } catch (e) {
+            console.warn("Failed to fetch lose description:", e);
+          }
         }
       }
 
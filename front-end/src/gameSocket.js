@@ -0,0 +1,116 @@
+// A whole game over one WebSocket (server: server/app/ws.py, served at /api/ws on
+// the API's own host and port). The server keeps the conversation and score, so
+// each turn only sends the new action.
+//
+// VITE_API_URL picks the backend (default http://localhost:5000);
+// VITE_GAME_TRANSPORT=http turns the socket off and uses the HTTP endpoints only.
+
+const API_URL = import.meta.env.VITE_API_URL || "http://localhost:5000";
+
+export const GAME_SOCKET_ENABLED = import.meta.env.VITE_GAME_TRANSPORT !== "http";
+
+export function gameSocketUrl() {
+  return API_URL.replace(/^http/, "ws").replace(/\/$/, "") + "/api/ws";
+}
+
+export class GameSocket {
+  constructor(url = gameSocketUrl()) {
+    this.url = url;
+    this.ws = null;
+    // the server answers messages one at a time, in order
+    this.pending = [];
+  }
+
+  connect(timeoutMs = 5000) {
+    return new Promise((resolve, reject) => {
+      const ws = new WebSocket(this.url);
+      const timer = setTimeout(() => {
+        ws.close();
+        reject(new Error("WebSocket connect timed out"));
+      }, timeoutMs);
+
+      ws.onopen = () => {
+        clearTimeout(timer);
+        this.ws = ws;
+        resolve(this);
+      };
+      ws.onerror = () => {
+        clearTimeout(timer);
+        reject(new Error("WebSocket connection failed"));
+      };
+      ws.onmessage = (event) => this.onMessage(JSON.parse(event.data));
+      ws.onclose = () => {
+        this.ws = null;
+        const pending = this.pending;
+        this.pending = [];
+        pending.forEach((request) =>
+          request.reject(new Error("WebSocket closed"))
+        );
+      };
+    });
+  }
+
+  get connected() {
+    return this.ws !== null && this.ws.readyState === WebSocket.OPEN;
+  }
+
+  onMessage(message) {
+    const request = this.pending[0];
+    if (!request) return;
+
+    if (message.type === "error") {
+      this.pending.shift();
+      request.reject(new Error(message.error));
+      return;
+    }
+
+    if (message.type === "story_chunk") {
+      if (request.onChunk) request.onChunk(message);
+      return;
+    }
+
+    request.frames.push(message);
+    if (request.isDone(message)) {
+      this.pending.shift();
+      request.resolve(request.frames);
+    }
+  }
+
+  request(message, isDone, onChunk) {
+    if (!this.connected) return Promise.reject(new Error("WebSocket closed"));
+    return new Promise((resolve, reject) => {
+      this.pending.push({ frames: [], isDone, onChunk, resolve, reject });
+      this.ws.send(JSON.stringify(message));
+    });
+  }
+
+  // Resolves with the opening story.
+  async start(username, onChunk) {
+    const frames = await this.request(
+      { type: "start", username },
+      (m) => m.type === "story" && m.phase === "opening",
+      onChunk
+    );
+    return frames[frames.length - 1].story;
+  }
+
+  // Resolves with { turn, ending }: the turn frame, plus the ending story frame
+  // when the turn ended the game.
+  async action(text, onChunk) {
+    const frames = await this.request(
+      { type: "action", action: text },
+      (m) =>
+        (m.type === "turn" && !m.game_over) ||
+        (m.type === "story" && m.phase === "ending"),
+      onChunk
+    );
+    const turn = frames.find((m) => m.type === "turn");
+    const ending = frames.find((m) => m.type === "story") || null;
+    return { turn, ending };
+  }
+
+  close() {
+    if (this.ws) this.ws.close();
+    this.ws = null;
+  }
+}
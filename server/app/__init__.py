@@ -1,30 +1,66 @@
-from flask import Flask
-from flask_cors import CORS
 from dotenv import load_dotenv
-import os
 
 # env vars
 load_dotenv()
 
+# must be installed before the heavier imports below so they show up in the profile
+from .startup_profile import startup_profile
+startup_profile.install()
+
+from flask import Flask
+from flask_cors import CORS
+import os
+
 def create_app():
     app = Flask(__name__)
+    startup_profile.attach(app)
     CORS(app)
 
-    # Secret key for sessions
-    app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
+    # Secret key for sessions and player tokens
+    from .services.player_tokens import DEV_SECRET_KEY
+    app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', DEV_SECRET_KEY)
 
     # db
-    app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///db.db')
+    from .db import db, configure_engine, engine_options, normalize_database_url
+    database_url = normalize_database_url(os.getenv('DATABASE_URL', 'sqlite:///db.db'))
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(database_url)
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
     # init db
-    from .db import db
     db.init_app(app)
+    with app.app_context():
+        configure_engine(db.engine)
+
+    from .models import GameResult, GameEvent
 
-    from .models import GameResult
+    from .services.event_log import event_log
+    event_log.init_app(app)
+
+    from .services.score_stats import score_stats
+    with app.app_context():
+        try:
+            score_stats.rebuild()
+        except Exception as e:
+            # e.g. tables not created yet (init_db.py)
+            print(f"Could not build score statistics: {e}")
 
     # bps
     from .api.routes import api
     app.register_blueprint(api)
 
+    from .request_profile import request_profiler
+    request_profiler.init_app(app)
+
+    # the game over WebSocket, on the same port
+    from .ws import init_app as init_ws
+    init_ws(app)
+
+    # import the Gemini SDK in the background instead of on the first request
+    if os.getenv('WARM_UP', 'False').lower() == 'true':
+        from .services.gemini import start_warm_up
+        start_warm_up()
+
+    startup_profile.app_ready()
+
     return app
\ No newline at end of file
@@ -0,0 +1,13 @@
+import hmac
+import os
+
+from flask import request
+
+
+def is_admin_request():
+    """
+    True if the request carries X-Admin-Token matching ADMIN_TOKEN. Admin features are off when it's unset.
+    """
+    admin_token = os.getenv('ADMIN_TOKEN')
+    provided = request.headers.get('X-Admin-Token', '')
+    return bool(admin_token) and hmac.compare_digest(provided.encode(), admin_token.encode())
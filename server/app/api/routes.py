@@ -1,14 +1,21 @@
-from flask import jsonify, request, Blueprint
+from flask import jsonify, request, Blueprint, Response, stream_with_context
 import json
-import os
-import secrets
-from google import genai
+import math
+from app.admin import is_admin_request
 from app.db import db
 from app.models import GameResult
-from datetime import datetime, timezone
+from app.request_profile import span
+from app.services import game
+from app.services.event_log import event_log
+from app.services.jobs import jobs, JobStoreFull
+from app.services.llm import llm
+from app.services import leaderboard as leaderboard_service
+from app.services.score_stats import score_stats
+from app.services.player_tokens import best_scores, is_signed_token, issue_token, read_token, TokenSigningDisabled
 
 api = Blueprint('api', __name__, url_prefix="/api")
 
+
 @api.route('/test')
 def test():
     return {'message': 'qwerty'}
@@ -23,47 +30,22 @@ def first_message():
 
     # --- Start of Try Block ---
     try:
-        # Initialize client (this might fail if the key isn't found/loaded correctly)
-        api_key = os.getenv('GEMINI_API_KEY')
-        if not api_key:
+        if not llm.available('first_message'):
              # Explicitly handle missing key right away
-             return jsonify({'error': 'GEMINI_API_KEY is not set in environment.'}), 500
-
-        client = genai.Client(api_key=api_key)
-
-        system_prompt = f"""You are a vivid, empathetic storytelling AI. The reader has name {username} use this name to address them,
-        write an opening description of at least five sentences that begins in a world of ruins produced by human actions.
-        Address the reader by inserting the username into the text at least once.
-        Include specific, plausible causes and facts about how the world reached this state—mention rising global
-        temperatures and extreme weather driven by carbon emissions, sea-level rise, deforestation and soil erosion,
-        industrial agriculture and monocultures, plastic pollution and microplastics in oceans and food,
-        ocean acidification and collapsing fisheries, species extinctions, air pollution and contaminated rivers,
-        and resource depletion—without turning the story into a list Output only the story text.
-        Leave the reader a question about what action they are taking in the present to prevent this future from occuring.
-        Imagine and set the story to be in the year 2100.
-        Begin with the phrase "The year is 2100". The description should be in present tense and not include characters.
-        The description should be 4-6 sentences.
-        Output no extra metadata, lists, instructions, or explanation, with no leading or trailing whitespace and just the text.
-        """
+             return jsonify({'error': 'Neither GEMINI_API_KEY nor OPENROUTER_API_KEY is set in environment.'}), 500
 
         # API Call - This is the most likely place for an external exception
-        response = client.models.generate_content(
-            model="gemini-2.5-flash-lite",
-            contents=system_prompt
-        )
-
-        ai_response = response.text
-       # print(f"AI Response: {ai_response}") # Print for server debugging
+        ai_response, degraded = game.generate_opening(username)
 
-        ai_response = ai_response.strip()
         # Successful Return
         return jsonify({
-            "story": ai_response
+            "story": ai_response,
+            "degraded": degraded
         }), 200
 
     # --- Exception Handling ---
     except:
-        # Catches errors specific to the Gemini API (e.g., key error, bad request)
+        # Catches errors from the model providers (e.g., key error, bad request)
         return jsonify({'error': 'Gemini API call failed',}), 500
 
 
@@ -91,20 +73,25 @@ def register_player():
     if not nickname:
         return jsonify({'error': 'Nickname is required'}), 400
 
+    try:
+        session_token = issue_token(nickname)
+    except TokenSigningDisabled as e:
+        print(f"Refusing to issue a player token: {e}")
+        return jsonify({'error': 'Player tokens are not configured on this server'}), 503
+
     existing = GameResult.query.filter_by(nickname=nickname).first()
+    best_scores.set(nickname, existing.total_score if existing else None)
 
-    if existing and existing.player_id:
+    if existing:
         return jsonify({
-            'session_token': existing.player_id,
+            'session_token': session_token,
             'nickname': existing.nickname,
             'returning_player': True,
             'best_score': existing.total_score
         })
 
-    player_id = secrets.token_urlsafe(16)
-
     return jsonify({
-        'session_token': player_id,
+        'session_token': session_token,
         'nickname': nickname,
         'returning_player': False
     }), 201
@@ -114,6 +101,7 @@ def register_player():
 def verify_player():
     """
     Verify if a player's session token is valid.
+    Signed tokens are checked without a database round trip; legacy random tokens are looked up.
 
     Headers:
     X-Player-Token: x
@@ -130,7 +118,33 @@ def verify_player():
     if not player_token:
         return jsonify({'error': 'No player token provided'}), 401
 
-    # if player exists in database
+    if is_signed_token(player_token):
+        claims = read_token(player_token)
+        if not claims:
+            return jsonify({'valid': False, 'error': 'Invalid player token'}), 401
+
+        nickname, _issued_at = claims
+        best_score = best_scores.get(nickname)
+        if best_score is best_scores.MISSING:
+            row = db.session.query(GameResult.total_score).filter_by(nickname=nickname).first()
+            best_score = row.total_score if row else None
+            best_scores.set(nickname, best_score)
+
+        if best_score is not None:
+            return jsonify({
+                'valid': True,
+                'nickname': nickname,
+                'best_score': best_score,
+                'player_id': player_token
+            })
+
+        return jsonify({
+            'valid': True,
+            'new_player': True,
+            'nickname': nickname
+        })
+
+    # legacy random token: look it up
     result = GameResult.query.filter_by(player_id=player_token).first()
 
     if result:
@@ -149,10 +163,31 @@ def verify_player():
 
 
     
+def queue_end_narrative(won, username, action, previous_context):
+    """
+    Job mode for the end-game narratives: generate on the worker pool and answer with a job id right away.
+    """
+    def generate():
+        story, degraded = game.generate_end_narrative(won, username, action, previous_context)
+        return {'story': story, 'degraded': degraded}
+
+    try:
+        job_id = jobs.submit(generate)
+    except JobStoreFull:
+        return jsonify({'error': 'Too many narratives in progress, try again shortly'}), 503
+
+    return jsonify({
+        'job_id': job_id,
+        'status': 'pending',
+        'result_url': f"/api/jobs/{job_id}"
+    }), 202
+
+
 @api.route('/generate-win-description', methods=['POST'])
 def generate_win_description():
     """
     Recieves score, previous context. Generates a description of a utopian society based on this.
+    Send "async": true (or ?mode=async) to get a job id back immediately and poll /api/jobs/<job_id>.
     """
     data = request.get_json()
 
@@ -163,63 +198,20 @@ def generate_win_description():
     action = data.get('action')
     previous_context = data.get('previous_context')
 
-    client = genai.Client(api_key=os.getenv('GEMINI_API_KEY'))
-
-
-    system_prompt = """You are the AI judge for "2100" - a game where player actions determine Earth's fate.
-    
-    The user describes an action they are taking in the present (2025).
-    You determine the effect it will have on the world in the year 2100.
-    The user has recieved enough points to win the game. 
-    Describe the hypothetical utopian green future they have created as a result of their actions in the present
-    STORY RULES:
-    - Begin with the phrase "The year is 2100"
-    - 3-5 sentences describing a hypothetical utopian future
-    - Consider how the most recent action, and all of the actions the user has previously taken, have led to this future
-    - Use present tense, as if you are telling a story in the year 2100
-    - Do not include characters including the narrator - this is a purely descriptive text
-    - Consequences should feel real.
-    - Next, tell the user this was a hypothetical scenario, but their actions have had positive impact in the real world
-    - Talk about their actions based on the previous conversation
-    - Use statistics and figures e.g. how much CO2 the user may have saved.
-    - You should encourage the user to reflect specifically on any bad choices they made that would be harmful
-    - And tell them how they could have done better
-    - This should inspire the user to do good 
-    Output no extra metadata, lists, instructions, or explanation, with no leading or trailing whitespace and just the text.
-    """
-    # Build messages for conversation
-    current_prompt = f'Player "{username}" action: "{action}"\n'
-
-    # If there's previous context, include it
-    full_prompt = system_prompt + "\n\n"
-    if previous_context and isinstance(previous_context, list):
-        full_prompt += "Previous conversation:\n"
-        for msg in previous_context:
-            role = msg.get('role', 'user')
-            content = msg.get('content', '')
-            full_prompt += f"{role}: {content}\n"
-        full_prompt += "\n"
-
-    full_prompt += current_prompt
-
-    response = client.models.generate_content(
-        model="gemini-2.5-flash",
-        contents=full_prompt
-    )
+    if data.get('async') or request.args.get('mode') == 'async':
+        return queue_end_narrative(True, username, action, previous_context)
 
     try:
-        ai_response = response.text
-       # print(f"AI Response: {ai_response}") # Print for server debugging
-
-        ai_response = ai_response.strip()
+        ai_response, degraded = game.generate_end_narrative(True, username, action, previous_context)
         # Successful Return
         return jsonify({
-            "story": ai_response
+            "story": ai_response,
+            "degraded": degraded
         }), 200
 
     # --- Exception Handling ---
     except:
-        # Catches errors specific to the Gemini API (e.g., key error, bad request)
+        # Catches errors from the model providers (e.g., key error, bad request)
         return jsonify({'error': 'Gemini API call failed',}), 500
 
 
@@ -227,6 +219,7 @@ def generate_win_description():
 def generate_lose_description():
     """
     Recieves score, previous context. Generates a description of the end of society based on this.
+    Send "async": true (or ?mode=async) to get a job id back immediately and poll /api/jobs/<job_id>.
     """
     data = request.get_json()
 
@@ -237,67 +230,50 @@ def generate_lose_description():
     action = data.get('action')
     previous_context = data.get('previous_context')
 
-    client = genai.Client(api_key=os.getenv('GEMINI_API_KEY'))
-
-
-    system_prompt = """You are the AI judge for "2100" - a game where player actions determine Earth's fate.
-    
-    The user describes an action they are taking in the present (2025).
-    You determine the effect it will have on the world in the year 2100.
-    The user has recieved -50 points and lost the game. 
-    Describe the hypothetical future they have created as a result of their actions in the present
-    In this future, all life on Earth has been wiped out due to environmental disasters.
-    STORY RULES:
-    - Begin with the phrase "The year is 2100"
-    - 3-5 sentences describing a hypothetical utopian future
-    - Consider how the most recent action, and all of the actions the user has previously taken, have led to this future
-    - Use present tense, as if you are telling a story in the year 2100
-    - Do not include characters including the narrator - this is a purely descriptive text
-    - Consequences should feel real.
-    - Next, tell the user this was a hypothetical scenario, but their actions have had a negative impact in the real world
-    - Talk about their actions based on the previous conversation
-    - Use statistics and figures e.g. how much the user may have contributed to climate change
-    - You should encourage the user to reflect specifically on any bad choices they made that would be harmful
-    - And tell them how they could have done better
-    - This should inspire the user to do good 
-    Output no extra metadata, lists, instructions, or explanation, with no leading or trailing whitespace and just the text.
-    """
-    # Build messages for conversation
-    current_prompt = f'Player "{username}" action: "{action}"\n'
-
-    # If there's previous context, include it
-    full_prompt = system_prompt + "\n\n"
-    if previous_context and isinstance(previous_context, list):
-        full_prompt += "Previous conversation:\n"
-        for msg in previous_context:
-            role = msg.get('role', 'user')
-            content = msg.get('content', '')
-            full_prompt += f"{role}: {content}\n"
-        full_prompt += "\n"
-
-    full_prompt += current_prompt
-
-    response = client.models.generate_content(
-        model="gemini-2.5-flash",
-        contents=full_prompt
-    )
+    if data.get('async') or request.args.get('mode') == 'async':
+        return queue_end_narrative(False, username, action, previous_context)
 
     try:
-        ai_response = response.text
-       # print(f"AI Response: {ai_response}") # Print for server debugging
-
-        ai_response = ai_response.strip()
+        ai_response, degraded = game.generate_end_narrative(False, username, action, previous_context)
         # Successful Return
         return jsonify({
-            "story": ai_response
+            "story": ai_response,
+            "degraded": degraded
         }), 200
 
     # --- Exception Handling ---
     except:
-        # Catches errors specific to the Gemini API (e.g., key error, bad request)
+        # Catches errors from the model providers (e.g., key error, bad request)
         return jsonify({'error': 'Gemini API call failed',}), 500
 
 
+@api.route('/jobs/<job_id>', methods=['GET'])
+def job_result(job_id):
+    """
+    Result of a queued job, e.g. an async end-game narrative.
+
+    Query params:
+    - wait: seconds to wait for the job to finish (long-poll, default 0, max 30)
+
+    Returns:
+    200 {"job_id": x, "status": "done", "story": "...", "degraded": false}
+    202 {"job_id": x, "status": "pending" | "running"}  // not finished yet, poll again
+    404 unknown or expired job
+    """
+    wait = max(0.0, min(request.args.get('wait', 0, type=float), 30.0))
+
+    job = jobs.get(job_id, wait=wait)
+    if job is None:
+        return jsonify({'error': 'Job not found or expired'}), 404
+
+    if job['status'] == jobs.DONE:
+        return jsonify(dict(job['result'], job_id=job_id, status=job['status'])), 200
+    if job['status'] == jobs.FAILED:
+        return jsonify({'job_id': job_id, 'status': job['status'], 'error': 'Gemini API call failed'}), 500
+
+    return jsonify({'job_id': job_id, 'status': job['status']}), 202
+
+
 @api.route('/submit-action', methods=['POST'])
 def submit_action():
     """
@@ -315,7 +291,8 @@ def submit_action():
         "scoreDelta": <number>,
         "story": "<story text>",
         "username": "player_name",
-        "action": "action description"
+        "action": "action description",
+        "degraded": false  // true when scored locally because no model was available
     }
     """
     data = request.get_json()
@@ -329,136 +306,12 @@ def submit_action():
 
     if not username or not action:
         return jsonify({'error': 'Missing username or action'}), 400
+    if not isinstance(action, str):
+        return jsonify({'error': 'action must be a string'}), 400
 
-    client = genai.Client(api_key=os.getenv('GEMINI_API_KEY'))
-
-
-    system_prompt = """You are the AI judge for "2100" - a game where player actions determine Earth's fate.
-    
-    The user describes an action they are taking in the present (2025).
-    You determine the effect it will have on the world in the year 2100.
-    The user's total score is given in the response as score.
-    A total score of 200 means the user has won, and the Earth is now a green utopia.
-    A total score of -50 means the user has lost, and humanity is extinct.
-    A total score of 0 means the world is in ruins as a result of climate disaster.
-    Be consistent with these values when generating your description.
-    Evaluate the environmental impact:
-
-    STORY RULES:
-    - Begin with the phrase "The year is 2100"
-    - Use the user's total score (score) to determine the state of Earth. Do not use scoreDelta for this. 
-    - 3-5 sentences maximum
-    - Be dramatic and visual
-    - Consider how the specific impacts will lead to a changed scenario in the future
-    - Focus more on the end result, with less detail on how we got there
-    - Use present tense, as if you are telling a story in the year 2100
-    - Do not include characters including the narrator - this is a purely descriptive text
-    - End it asking what else the user will do
-    
-
-    Generate a score delta based on the impact of the user's action.
-    SCORE DELTA GUIDE:
-    +40 to +50: Major positive (renewable energy, veganism, reforestation)
-    +20 to +40: Good actions (cycling, composting, reducing waste)
-    +5 to +20: Small positive (recycling, shorter showers, LED bulbs)
-    -5 to +5: Neutral/minimal impact
-    -20 to -5: Small negative (occasional meat, short flights)
-    -40 to -20: Bad actions (SUV purchase, excessive consumption)
-    -50 to -40: Terrible (deforestation, heavy pollution, coal rolling)
-
-    Generate a sentiment based on the user's action
-    SENTIMENT GUIDE (emotional tone):
-    +0.8 to +1.0: Extremely positive/hopeful
-    +0.4 to +0.8: Moderately positive
-    0.0 to +0.4: Slightly positive/neutral
-    -0.4 to 0.0: Slightly negative/concerning
-    -1.0 to -0.4: Very negative/alarming
-
-    OUTPUT FORMAT (JSON only, no markdown, no code blocks):
-    {
-        "scoreDelta": <number between -50 and +50>,
-        "sentiment": <number between -1 and +1>,
-        "story": "<compelling 2-3 sentence environmental impact story>"
-    }"""
-
-    # Build messages for conversation
-    current_prompt = f'Player "{username}" action: "{action}"\n\nEvaluate this action and respond with JSON only.'
-
-    # If there's previous context, include it
-    full_prompt = system_prompt + "\n\n"
-    if previous_context and isinstance(previous_context, list):
-        full_prompt += "Previous conversation:\n"
-        for msg in previous_context:
-            role = msg.get('role', 'user')
-            content = msg.get('content', '')
-            full_prompt += f"{role}: {content}\n"
-        full_prompt += "\n"
-
-    full_prompt += current_prompt
-
-    response = client.models.generate_content(
-        model="gemini-2.5-flash-lite",
-        contents=full_prompt
-    )
-
-    ai_response = response.text
-
-    try:
-        cleaned_response = ai_response.strip()
-
-        # Remove markdown code blocks more robustly
-        if '```json' in cleaned_response:
-            # Extract content between ```json and ```
-            start = cleaned_response.find('```json') + 7
-            end = cleaned_response.find('```', start)
-            cleaned_response = cleaned_response[start:end].strip()
-        elif '```' in cleaned_response:
-            # Extract content between ``` and ```
-            start = cleaned_response.find('```') + 3
-            end = cleaned_response.find('```', start)
-            cleaned_response = cleaned_response[start:end].strip()
-
-        # Fix invalid JSON (like +45 instead of 45)
-        import re
-        cleaned_response = re.sub(r':\s*\+(\d+)', r': \1', cleaned_response)
-
-        parsed = json.loads(cleaned_response)
-        scoreDelta = parsed.get('scoreDelta', 0)
-        sentiment = parsed.get('sentiment', 0.0)
-        story = parsed.get('story', '')
-    except (json.JSONDecodeError, Exception) as e:
-        print(f"JSON decode error: {e}")
-        print(f"AI Response: {ai_response}")
-        scoreDelta = 0
-        sentiment = 0.0
-        story = "Error parsing AI response"
-
-    # Build updated context with clean story (not raw AI response)
-    if previous_context and isinstance(previous_context, list):
-        updated_context = previous_context.copy()
-    else:
-        updated_context = []
-
-    updated_context.append({"role": "user", "content": action})
-    updated_context.append({"role": "assistant", "content": story})
-
-    print(
-        {'scoreDelta': scoreDelta,
-        'sentiment': sentiment,
-        'story': story,
-        'username': username,
-        'action': action,
-        'previouscontext': updated_context
-         })
+    result = game.play_turn(username, action, previous_context)
 
-    return jsonify({
-        'scoreDelta': scoreDelta,
-        'sentiment': sentiment,
-        'story': story,
-        'username': username,
-        'action': action,
-        'previouscontext': updated_context
-    })
+    return jsonify(result)
 
 
 @api.route('/game/end', methods=['POST'])
@@ -500,90 +353,21 @@ def end_game():
     if not nickname or initial_years is None or final_years is None or total_score is None:
         return jsonify({'error': 'Missing required fields'}), 400
 
-    try:
-        # Check if player already exists
-        existing_result = GameResult.query.filter_by(nickname=nickname).first()
-
-        print(f"DEBUG: Looking for nickname '{nickname}'")
-        print(f"DEBUG: Found existing? {existing_result is not None}")
-        if existing_result:
-            print(f"DEBUG: Existing score: {existing_result.total_score}, New score: {total_score}")
-
-        if existing_result:
-            # Update only if new score is better
-            if total_score > existing_result.total_score:
-                existing_result.initial_years = initial_years
-                existing_result.final_years = final_years
-                existing_result.total_score = total_score
-                existing_result.actions_count = actions_count
-                existing_result.status = status
-                existing_result.played_at = datetime.now(timezone.utc)
-
-                db.session.commit()
-
-                # Calculate rank
-                rank = GameResult.query.filter(GameResult.total_score > total_score).count() + 1
-
-                return jsonify({
-                    'message': 'Game result updated (new high score!)',
-                    'id': existing_result.id,
-                    'rank': rank,
-                    'years_saved': final_years - initial_years,
-                    'improved': True
-                }), 200
-            else:
-                # Don't update, but return current rank
-                rank = GameResult.query.filter(GameResult.total_score > existing_result.total_score).count() + 1
-
-                return jsonify({
-                    'message': 'Score not improved, kept previous best',
-                    'id': existing_result.id,
-                    'rank': rank,
-                    'years_saved': final_years - initial_years,
-                    'improved': False,
-                    'best_score': existing_result.total_score
-                }), 200
-        else:
-            # Create new game result for new player
-            game_result = GameResult(
-                nickname=nickname,
-                player_id=player_id,  # Save player_id
-                initial_years=initial_years,
-                final_years=final_years,
-                total_score=total_score,
-                actions_count=actions_count,
-                status=status,
-                played_at=datetime.now(timezone.utc)
-            )
-
-            db.session.add(game_result)
-            db.session.commit()
-
-            # Calculate rank
-            rank = GameResult.query.filter(GameResult.total_score > total_score).count() + 1
-
-            return jsonify({
-                'message': 'Game result saved successfully',
-                'id': game_result.id,
-                'rank': rank,
-                'years_saved': final_years - initial_years,
-                'improved': True
-            }), 201
-
-    except Exception as e:
-        db.session.rollback()
-        print(f"Error saving game result: {e}")
-        return jsonify({'error': 'Failed to save game result'}), 500
+    body, status_code = game.save_result(
+        nickname, player_id, initial_years, final_years, total_score, actions_count, status
+    )
+    return jsonify(body), status_code
 
 
 @api.route('/leaderboard', methods=['GET'])
 def leaderboard():
     """
-    Get top players from leaderboard.
+    Get players from leaderboard, one page at a time.
 
     Query params:
     - limit: number of results (default 10, max 100)
     - sort_by: 'score' (default) or 'years_saved'
+    - cursor: next_cursor from the previous page (omit for the top of the board)
 
     Returns:
     {
@@ -599,37 +383,185 @@ def leaderboard():
             },
             ...
         ],
-        "total_players": 150
+        "total_players": 150,
+        "next_cursor": "WzI1MC4wLCAxXQ"  // null on the last page
     }
     """
     limit = request.args.get('limit', 10, type=int)
     sort_by = request.args.get('sort_by', 'score')
+    cursor = request.args.get('cursor')
 
-    limit = min(limit, 100)
+    limit = max(1, min(limit, 100))
 
     try:
-        if sort_by == 'years_saved':
-            # Sort by (final_years - initial_years) descending
-            results = GameResult.query.order_by(
-                (GameResult.final_years - GameResult.initial_years).desc()
-            ).limit(limit).all()
-        else:
-            # sort by total_score
-            results = GameResult.query.order_by(
-                GameResult.total_score.desc()
-            ).limit(limit).all()
-
-        total_players = GameResult.query.count()
+        with span('db'):
+            results, next_cursor = leaderboard_service.page(sort_by, limit, cursor)
 
         leaderboard_data = [result.to_dict() for result in results]
 
+        total_players = score_stats.player_count()
+        if total_players is None:
+            # the startup rebuild failed, count the table instead
+            with span('db'):
+                total_players = GameResult.query.count()
+
         return jsonify({
             'leaderboard': leaderboard_data,
             'total_players': total_players,
             'limit': limit,
+            'sort_by': sort_by,
+            'next_cursor': next_cursor
+        })
+
+    except leaderboard_service.InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Error fetching leaderboard: {e}")
+        return jsonify({'error': 'Failed to fetch leaderboard'}), 500
+
+
+@api.route('/leaderboard/around', methods=['GET'])
+def leaderboard_around():
+    """
+    The players ranked just above and below one player.
+
+    Query params (or an X-Player-Token header instead of nickname):
+    - nickname: the player to centre on
+    - k: players to show on each side (default 5, max 50)
+    - sort_by: 'score' (default) or 'years_saved'
+
+    Returns:
+    {
+        "leaderboard": [{..., "rank": 41}, ..., {..., "rank": 51}],
+        "player": {..., "rank": 46},
+        "sort_by": "score"
+    }
+    """
+    nickname = request.args.get('nickname')
+    k = max(0, min(request.args.get('k', 5, type=int), 50))
+    sort_by = request.args.get('sort_by', 'score')
+    player_token = request.headers.get('X-Player-Token')
+
+    if not nickname and player_token:
+        if is_signed_token(player_token):
+            claims = read_token(player_token)
+            nickname = claims[0] if claims else None
+        else:
+            result = GameResult.query.filter_by(player_id=player_token).first()
+            nickname = result.nickname if result else None
+
+    if not nickname:
+        return jsonify({'error': 'nickname or a valid X-Player-Token is required'}), 400
+
+    try:
+        result = GameResult.query.filter_by(nickname=nickname).first()
+        if not result:
+            return jsonify({'error': 'Player has no saved game'}), 404
+
+        with span('db'):
+            entries = leaderboard_service.ranked(
+                leaderboard_service.around(result, sort_by, k), sort_by
+            )
+        player = next(entry for entry in entries if entry['id'] == result.id)
+
+        return jsonify({
+            'leaderboard': entries,
+            'player': player,
             'sort_by': sort_by
         })
 
     except Exception as e:
         print(f"Error fetching leaderboard: {e}")
         return jsonify({'error': 'Failed to fetch leaderboard'}), 500
+
+
+@api.route('/llm/status', methods=['GET'])
+def llm_status():
+    """
+    Live latency and error rates per endpoint and provider, as used for routing.
+
+    Headers:
+    X-Admin-Token: x
+    """
+    if not is_admin_request():
+        return jsonify({'error': 'Not authorized'}), 403
+
+    return jsonify(llm.status())
+
+
+@api.route('/stats', methods=['GET'])
+def stats():
+    """
+    Distribution of players' best games, served from in-memory sketches (no table scan).
+
+    Returns:
+    {
+        "total_players": 150,
+        "won": 90,
+        "lost": 60,
+        "win_ratio": 0.6,
+        "metrics": {
+            "total_score": {"count": 150, "mean": 120.5, "p50": 130.0, "p90": 210.0, "p99": 240.0,
+                            "histogram": [{"low": 125, "high": 130, "count": 12}, ...]},
+            "years_saved": {...},
+            "actions_count": {...}
+        }
+    }
+    """
+    return jsonify(score_stats.summary())
+
+
+@api.route('/stats/percentile', methods=['GET'])
+def stats_percentile():
+    """
+    What percentage of players scored below a value.
+
+    Query params:
+    - metric: 'total_score' (default), 'years_saved' or 'actions_count'
+    - value: the value to place
+
+    Returns:
+    {
+        "metric": "total_score",
+        "value": 150,
+        "percentile": 72.5
+    }
+    """
+    metric = request.args.get('metric', 'total_score')
+    value = request.args.get('value', type=float)
+
+    if metric not in score_stats.METRICS:
+        return jsonify({'error': f"metric must be one of {', '.join(score_stats.METRICS)}"}), 400
+    if value is None:
+        return jsonify({'error': 'value is required'}), 400
+    if not math.isfinite(value):
+        return jsonify({'error': 'value must be a finite number'}), 400
+
+    return jsonify({
+        'metric': metric,
+        'value': value,
+        'percentile': score_stats.percentile(metric, value)
+    })
+
+
+@api.route('/events/export', methods=['GET'])
+def export_events():
+    """
+    Stream the per-turn game event log as JSON lines, oldest first.
+
+    Headers:
+    X-Admin-Token: x
+
+    Query params:
+    - since: only events with a larger id (default 0), to resume an export
+    """
+    if not is_admin_request():
+        return jsonify({'error': 'Not authorized'}), 403
+
+    since = request.args.get('since', 0, type=int)
+
+    def generate():
+        for event in event_log.export(since_id=since):
+            yield json.dumps(event.to_dict()) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
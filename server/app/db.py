@@ -1,3 +1,82 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+import os
 
-db = SQLAlchemy()
\ No newline at end of file
+db = SQLAlchemy()
+
+
+# Engine profiles, picked from the DATABASE_URL scheme.
+# Set DB_ENGINE_PROFILE=off to get SQLAlchemy's defaults (e.g. to compare in benchmarks/db_contention.py).
+
+def _env_int(name, default):
+    return int(os.getenv(name, str(default)))
+
+
+def normalize_database_url(url):
+    # Railway (and Heroku) hand out postgres://, which SQLAlchemy 2 no longer accepts
+    if url.startswith('postgres://'):
+        return 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def engine_profile(url):
+    """
+    Return 'sqlite', 'postgres' or None for the given database URL.
+    """
+    if os.getenv('DB_ENGINE_PROFILE', 'auto').lower() == 'off':
+        return None
+    if url.startswith('sqlite'):
+        return 'sqlite'
+    if url.startswith('postgresql'):
+        return 'postgres'
+    return None
+
+
+def engine_options(url):
+    """
+    SQLALCHEMY_ENGINE_OPTIONS for the database URL.
+    """
+    profile = engine_profile(url)
+
+    if profile == 'sqlite':
+        # sqlite3's own busy handler, in seconds; the PRAGMA below covers raw connections too
+        return {
+            'connect_args': {'timeout': _env_int('SQLITE_BUSY_TIMEOUT_MS', 5000) / 1000}
+        }
+
+    if profile == 'postgres':
+        return {
+            'pool_size': _env_int('DB_POOL_SIZE', 5),
+            'max_overflow': _env_int('DB_MAX_OVERFLOW', 10),
+            'pool_timeout': _env_int('DB_POOL_TIMEOUT', 10),
+            # Railway's proxy drops idle connections, so check them out healthy and retire them early
+            'pool_pre_ping': True,
+            'pool_recycle': _env_int('DB_POOL_RECYCLE', 1800),
+            'connect_args': {
+                'connect_timeout': _env_int('DB_CONNECT_TIMEOUT', 10),
+                'options': (
+                    f"-c statement_timeout={_env_int('DB_STATEMENT_TIMEOUT_MS', 5000)} "
+                    f"-c idle_in_transaction_session_timeout={_env_int('DB_IDLE_TX_TIMEOUT_MS', 10000)}"
+                ),
+            },
+        }
+
+    return {}
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    # WAL lets leaderboard reads carry on while end_game writes
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={_env_int('SQLITE_BUSY_TIMEOUT_MS', 5000)}")
+    cursor.execute(f"PRAGMA mmap_size={_env_int('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)}")
+    cursor.close()
+
+
+def configure_engine(engine):
+    """
+    Per-connection settings that can't be passed through engine options.
+    """
+    if engine_profile(str(engine.url)) == 'sqlite':
+        event.listen(engine, 'connect', _set_sqlite_pragmas)
@@ -29,4 +29,38 @@ class GameResult(db.Model):
             'status': self.status,
             'played_at': self.played_at.isoformat() if self.played_at else None,
             'years_saved': self.final_years - self.initial_years
-        }
\ No newline at end of file
+        }
+
+
+# Leaderboard orderings, for keyset pagination (app/services/leaderboard.py)
+db.Index('ix_game_results_total_score_id', GameResult.total_score, GameResult.id)
+db.Index(
+    'ix_game_results_years_saved_id',
+    GameResult.final_years - GameResult.initial_years,
+    GameResult.id
+)
+
+class GameEvent(db.Model):
+    """
+    Append-only log of individual turns, written in batches by app.services.event_log.
+    """
+    __tablename__ = 'game_events'
+
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)
+    created_at = db.Column(db.DateTime, nullable=False, index=True)  # used for pruning
+    nickname = db.Column(db.String(50), nullable=False, index=True)
+    turn = db.Column(db.Integer, nullable=False)  # 1-based turn within the game
+    action = db.Column(db.Text, nullable=False)
+    score_delta = db.Column(db.Float, nullable=True)
+    sentiment = db.Column(db.Float, nullable=True)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'nickname': self.nickname,
+            'turn': self.turn,
+            'action': self.action,
+            'score_delta': self.score_delta,
+            'sentiment': self.sentiment
+        }
@@ -0,0 +1,189 @@
+"""
+On-demand request profiling.
+
+With REQUEST_PROFILING=on, /api requests are profiled when they carry
+`X-Profile: 1` together with a valid X-Admin-Token, or at random with
+probability PROFILE_SAMPLE_RATE. A profiled request is sampled from a
+background thread every PROFILE_INTERVAL_MS and written out as a collapsed-stack
+file (one "frame;frame;frame count" line per stack, the input format of
+flamegraph.pl, speedscope and inferno) in PROFILE_DIR, which keeps the newest
+PROFILE_MAX_FILES. Code wrapped in span()
+shows up as a "span:<name>" frame and in the response's Server-Timing header.
+
+With REQUEST_PROFILING off no hooks are installed, and span() is a dict lookup.
+"""
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+
+_active = {}  # thread ident -> RequestProfile being recorded on that thread
+_NULL_SPAN = nullcontext()
+
+
+class RequestProfile:
+
+    def __init__(self, name, thread_ident):
+        self.name = name
+        self.thread_ident = thread_ident
+        self.started_at = time.perf_counter()
+        self.labels = []  # open spans, outermost first
+        self.span_times = Counter()  # span name -> seconds
+        self.stacks = Counter()  # collapsed stack -> samples
+
+    @contextmanager
+    def span(self, label):
+        self.labels.append(label)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.span_times[label] += time.perf_counter() - start
+            self.labels.pop()
+
+    def sample(self, frame):
+        frames = []
+        while frame is not None:
+            code = frame.f_code
+            frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        frames.reverse()
+
+        labels = [f"span:{label}" for label in list(self.labels)]
+        # spans go right above the request so the flamegraph splits by phase first
+        self.stacks[';'.join([self.name] + labels + frames)] += 1
+
+    def server_timing(self):
+        entries = [f"{label};dur={seconds * 1000:.1f}" for label, seconds in self.span_times.items()]
+        entries.append(f"total;dur={(time.perf_counter() - self.started_at) * 1000:.1f}")
+        return ', '.join(entries)
+
+
+def span(label):
+    """
+    Label a phase of the current request (e.g. 'model_call', 'parse', 'db') in its profile.
+    """
+    profile = _active.get(threading.get_ident())
+    if profile is None:
+        return _NULL_SPAN
+    return profile.span(label)
+
+
+class RequestProfiler:
+
+    def __init__(self):
+        self.enabled = os.getenv('REQUEST_PROFILING', 'off').lower() == 'on'
+        self.sample_rate = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+        self.interval = int(os.getenv('PROFILE_INTERVAL_MS', '5')) / 1000
+        self.output_dir = os.getenv('PROFILE_DIR')
+        # oldest files are deleted beyond this many
+        self.max_files = int(os.getenv('PROFILE_MAX_FILES', '200'))
+        self._sampler = None
+        self._wake = threading.Event()  # set by start() for a sampler waiting on an idle app
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        if not self.enabled:
+            return
+
+        from flask import g, request
+
+        if self.output_dir is None:
+            self.output_dir = os.path.join(app.instance_path, 'profiles')
+
+        @app.before_request
+        def start_profile():
+            if request.blueprint != 'api' or not self._wanted(request):
+                return
+            g.request_profile = self.start(f"{request.method} {request.url_rule or request.path}")
+
+        @app.after_request
+        def finish_profile(response):
+            profile = g.pop('request_profile', None)
+            if profile is not None:
+                path = self.finish(profile)
+                response.headers['Server-Timing'] = profile.server_timing()
+                if path:
+                    response.headers['X-Profile-File'] = os.path.basename(path)
+            return response
+
+        @app.teardown_request
+        def drop_profile(exc):
+            # after_request doesn't run when the view raises
+            _active.pop(threading.get_ident(), None)
+
+    def _wanted(self, request):
+        from app.admin import is_admin_request
+
+        if request.headers.get('X-Profile') == '1' and is_admin_request():
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def start(self, name):
+        ident = threading.get_ident()
+        profile = RequestProfile(name, ident)
+        _active[ident] = profile
+        self._ensure_sampler()
+        self._wake.set()
+        return profile
+
+    def finish(self, profile):
+        _active.pop(profile.thread_ident, None)
+        if not profile.stacks:
+            return None
+
+        stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')
+        slug = ''.join(c if c.isalnum() else '-' for c in profile.name).strip('-')
+        path = os.path.join(self.output_dir, f"{stamp}-{slug}.folded")
+
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            with open(path, 'w') as out:
+                for stack, count in profile.stacks.most_common():
+                    out.write(f"{stack} {count}\n")
+        except OSError as e:
+            print(f"Could not write request profile: {e}")
+            return None
+
+        self._rotate()
+        return path
+
+    def _rotate(self):
+        try:
+            # names start with a UTC timestamp, so they sort oldest first
+            names = sorted(name for name in os.listdir(self.output_dir) if name.endswith('.folded'))
+            for name in names[:max(0, len(names) - self.max_files)]:
+                os.remove(os.path.join(self.output_dir, name))
+        except OSError as e:
+            print(f"Could not rotate request profiles: {e}")
+
+    def _ensure_sampler(self):
+        if self._sampler is not None and self._sampler.is_alive():
+            return
+        with self._lock:
+            if self._sampler is None or not self._sampler.is_alive():
+                self._sampler = threading.Thread(target=self._sample_loop, name='request-profiler', daemon=True)
+                self._sampler.start()
+
+    def _sample_loop(self):
+        # one sampler for every profiled request; it sleeps on _wake while none are running
+        while True:
+            if not _active:
+                self._wake.clear()
+                # a start() between the check and clear() has set _active already
+                if not _active:
+                    self._wake.wait()
+                continue
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            for ident, profile in list(_active.items()):
+                frame = frames.get(ident)
+                if frame is not None:
+                    profile.sample(frame)
+
+
+request_profiler = RequestProfiler()
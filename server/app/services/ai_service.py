@@ -1,13 +1,8 @@
-import os
-import requests
+from app.services.llm import llm, LLMError
 
 
 class AIService:
 
-    def __init__(self):
-        self.api_key = os.getenv('OPENROUTER_API_KEY')
-        self.base_url = "https://openrouter.ai/api/v1/chat/completions"
-
     def evaluate_action(self, username: str, action: str) -> dict:
         prompt = f"""You are an environmental impact evaluator for a planet-saving game.
 
@@ -23,32 +18,8 @@ Respond in JSON format:
     "story": "<story text>"
 }}"""
 
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-
-        payload = {
-            "model": "meta-llama/llama-3.1-8b-instruct:free",  # Free model
-            "messages": [
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ]
-        }
-
         try:
-            response = requests.post(
-                self.base_url,
-                headers=headers,
-                json=payload,
-                timeout=30
-            )
-            response.raise_for_status()
-
-            result = response.json()
-            content = result['choices'][0]['message']['content']
+            content = llm.generate('evaluate_action', prompt)
 
             import json
             try:
@@ -64,8 +35,8 @@ Respond in JSON format:
                     'story': content
                 }
 
-        except requests.exceptions.RequestException as e:
-            print(f"Error calling OpenRouter API: {e}")
+        except LLMError as e:
+            print(f"Error evaluating action: {e}")
             return {
                 'score': 0,
                 'story': f"Error evaluating action: {str(e)}"
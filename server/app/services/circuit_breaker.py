@@ -0,0 +1,99 @@
+import threading
+import time
+
+
+class CircuitBreaker:
+    """
+    Classic three-state breaker.
+
+    closed:    calls go through; `failure_threshold` consecutive failures (or calls
+               slower than `slow_call_seconds`) open it.
+    open:      calls are refused straight away until `reset_timeout` has passed.
+    half_open: up to `half_open_max_calls` probe calls go through; a success closes
+               the breaker, a failure opens it again.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0, half_open_max_calls=1,
+                 slow_call_seconds=None):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.slow_call_seconds = slow_call_seconds
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.times_opened = 0
+        self._probes = 0
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            self._probes = 0
+
+    def available(self):
+        """
+        Whether a call would currently be let through. Doesn't take a probe slot.
+        """
+        with self._lock:
+            self._refresh()
+            if self.state == self.HALF_OPEN:
+                return self._probes < self.half_open_max_calls
+            return self.state == self.CLOSED
+
+    def acquire(self):
+        """
+        Ask to make a call. Every True must be followed by record_success(), record_failure()
+        or release().
+        """
+        with self._lock:
+            self._refresh()
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and self._probes < self.half_open_max_calls:
+                self._probes += 1
+                return True
+            return False
+
+    def record_success(self, elapsed=None):
+        if self.slow_call_seconds is not None and elapsed is not None and elapsed > self.slow_call_seconds:
+            self.record_failure()
+            return
+
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probes = 0
+
+    def release(self):
+        """
+        Give back a call that ended without a verdict (e.g. its reader went away).
+        """
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._probes = max(0, self._probes - 1)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                    print(f"Circuit breaker {self.name} opened after {self.failures} failures")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._probes = 0
+
+    def to_dict(self):
+        with self._lock:
+            self._refresh()
+            return {
+                'state': self.state,
+                'failures': self.failures,
+                'times_opened': self.times_opened,
+            }
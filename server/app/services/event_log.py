@@ -0,0 +1,164 @@
+import atexit
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, insert
+
+from app.db import db
+from app.models import GameEvent
+
+
+NICKNAME_LENGTH = GameEvent.__table__.c.nickname.type.length
+
+
+def _as_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class EventLog:
+    """
+    Buffers game events in memory and bulk-inserts them from a background thread,
+    so recording an event never waits on the database. If the buffer fills up
+    (database down or too slow) new events are dropped and counted.
+    """
+
+    def __init__(self, batch_size=200, flush_interval=1.0, max_buffer=10000,
+                 retention_days=90, prune_interval=3600):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retention_days = retention_days
+        self.prune_interval = prune_interval
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_buffer)
+        self._app = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._last_prune = 0.0
+
+    def init_app(self, app):
+        self._app = app
+        atexit.register(self.flush)
+
+    def record(self, nickname, turn, action, score_delta=None, sentiment=None):
+        if self._app is None:
+            return
+
+        event = {
+            'created_at': datetime.now(timezone.utc),
+            # one row the column rejects (Postgres enforces the length) would fail the whole batch
+            'nickname': str(nickname)[:NICKNAME_LENGTH],
+            'turn': turn,
+            'action': action,
+            'score_delta': _as_float(score_delta),
+            'sentiment': _as_float(sentiment),
+        }
+
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+            return
+
+        self._ensure_worker()
+
+    def _ensure_worker(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='event-log-writer', daemon=True)
+                self._thread.start()
+
+    def _drain(self, batch):
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                first = None
+
+            if first is not None:
+                batch = self._drain([first])
+                # let a few more events arrive so inserts go out in bigger batches
+                if len(batch) < self.batch_size:
+                    time.sleep(min(self.flush_interval, 0.05))
+                    batch = self._drain(batch)
+                self._write(batch)
+
+            if self.retention_days and time.monotonic() - self._last_prune > self.prune_interval:
+                self._last_prune = time.monotonic()
+                self.prune()
+
+    def _write(self, batch):
+        with self._app.app_context():
+            try:
+                db.session.execute(insert(GameEvent), batch)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                self.dropped += len(batch)
+                print(f"Error writing {len(batch)} game events: {e}")
+
+    def flush(self):
+        """
+        Write everything still buffered, on the calling thread.
+        """
+        if self._app is None:
+            return
+        while True:
+            batch = self._drain([])
+            if not batch:
+                return
+            self._write(batch)
+
+    def prune(self):
+        """
+        Delete events older than the retention window.
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(days=self.retention_days)
+        with self._app.app_context():
+            try:
+                result = db.session.execute(delete(GameEvent).where(GameEvent.created_at < cutoff))
+                db.session.commit()
+                if result.rowcount:
+                    print(f"Pruned {result.rowcount} game events older than {self.retention_days} days")
+            except Exception as e:
+                db.session.rollback()
+                print(f"Error pruning game events: {e}")
+
+    def export(self, since_id=0, chunk_size=1000):
+        """
+        Yield events with id > since_id in id order, reading the table in keyset chunks.
+        Needs an app context.
+        """
+        last_id = since_id
+        while True:
+            rows = GameEvent.query.filter(GameEvent.id > last_id) \
+                .order_by(GameEvent.id).limit(chunk_size).all()
+            if not rows:
+                return
+            for row in rows:
+                yield row
+            last_id = rows[-1].id
+            db.session.expunge_all()
+
+
+event_log = EventLog(
+    batch_size=int(os.getenv('EVENT_LOG_BATCH_SIZE', '200')),
+    flush_interval=float(os.getenv('EVENT_LOG_FLUSH_INTERVAL', '1.0')),
+    max_buffer=int(os.getenv('EVENT_LOG_MAX_BUFFER', '10000')),
+    retention_days=int(os.getenv('EVENT_RETENTION_DAYS', '90')),
+)
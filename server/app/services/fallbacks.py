@@ -0,0 +1,176 @@
+import random
+import re
+import threading
+from collections import OrderedDict, deque
+
+# Degraded-mode content, served when no model is available (circuit open, provider
+# down, unparseable reply). Recent good model output is reused where it fits;
+# otherwise a local keyword heuristic and fixed templates stand in.
+
+OPENING_TEMPLATES = [
+    "The year is 2100, {username}. Coastal cities lie half-drowned beneath seas that rose with every ton of carbon "
+    "burned, and summers now bring heat that fields and forests can no longer survive. Rivers run thick with plastic "
+    "and runoff from exhausted farmland, and the reefs that once fed millions are bleached white and silent. "
+    "Species vanished one by one as forests were cleared and oceans acidified, and the air itself carries the haze "
+    "of a century of pollution. What will you do today, {username}, to keep this future from happening?",
+    "The year is 2100, {username}. Dust storms sweep across soil stripped bare by monocultures and deforestation, "
+    "and the glaciers that fed great rivers are gone. Fisheries have collapsed in acidic, overheated oceans, and "
+    "microplastics are found in every meal. Heatwaves and floods arrive each year stronger than the last, driven by "
+    "the emissions of the century before. What action will you take in the present, {username}, to change this?",
+]
+
+# (keywords, scoreDelta, sentiment) following the score guide in the turn prompt.
+# Keywords are regular expressions matched as whole words, with their inflections
+# spelled out, so 'trains?' doesn't catch training nor 'wind power' a window.
+ACTION_RULES = [
+    ((r'deforest\w*', r'coal', r'pollut\w*', r'burn\w*', r'oil spills?', r'dump\w*'), -45, -0.8),
+    ((r'suvs?', r'private jets?', r'fast fashion', r'excessive\w*', r'consum\w*'), -30, -0.5),
+    ((r'meat', r'beef', r'flights?', r'fl(?:y|ies|ying|ew|own)', r'plastic bags?', r'driv(?:e|es|ing|en)', r'drove'),
+     -12, -0.2),
+    ((r'solar', r'wind (?:power|energy|turbines?|farms?)', r'windmills?', r'renewables?', r'vegan\w*',
+      r'reforest\w*', r'plant(?:ed|ing)? (?:\w+ )?trees?', r'tree planting', r'rewild\w*'), 45, 0.9),
+    ((r'(?:bi)?cycl(?:e|es|ed|ing|ist)', r'bikes?', r'bik(?:ed|ing)', r'compost\w*', r'public transport',
+      r'trains?', r'bus(?:es)?', r'reduce waste', r'vegetarian\w*'), 30, 0.6),
+    ((r'recycl\w*', r'showers?', r'led (?:bulbs?|lights?|lamps?|lighting)', r'reusable\w*',
+      r'turn(?:ed|ing)? off', r'insulat\w*'), 12, 0.3),
+]
+
+# Words that turn a keyword around: "stopped burning trash", "campaigned to stop deforestation",
+# "instead of meat" before it (within NEGATION_WINDOW words), "drive less" right after it.
+NEGATIONS_BEFORE = (
+    'stop', 'stopped', 'quit', 'less', 'fewer', 'reduce', 'reduced', 'cut', 'avoid', 'avoided', 'ban', 'banned',
+    'instead of', 'no', 'not', 'never', 'dont', 'didnt', 'against', 'switch', 'switched', 'replace', 'replaced',
+)
+NEGATIONS_AFTER = ('less', 'fewer')
+NEGATION_WINDOW = 3
+# a negation does not reach past these ("drive less and cycle")
+CLAUSE_BREAKS = ('and', 'but', 'then', 'or', 'so')
+
+# a harmful habit given up (or a good one dropped) is worth the smallest step of the guide
+NEGATED_SCORE = (12, 0.3)
+
+TURN_STORIES = {
+    'positive': "The year is 2100. Choices like this one, repeated by millions, have slowed the warming and given "
+                "forests, rivers and seas room to recover. Cleaner air and greener cities hint at what is still "
+                "possible. What else will you do?",
+    'neutral': "The year is 2100. The world looks much as it did, its future still balanced between ruin and "
+               "renewal. Small choices have yet to tip the scales either way. What else will you do?",
+    'negative': "The year is 2100. Habits like this one, multiplied across a century, have deepened the heat, the "
+                "floods and the silence of emptied ecosystems. The damage is real, but not yet final. What else "
+                "will you do?",
+}
+
+END_TEMPLATES = {
+    True: "The year is 2100. Forests have reclaimed abandoned highways, rivers run clear, and cities hum on sun and "
+          "wind instead of smoke. This future was hypothetical, {username}, but the {actions} choices you made "
+          "point in the same direction as the real changes that cut emissions, protect habitats and keep plastic "
+          "out of the oceans. Think back on any choice that did harm and how it could have been better, and keep "
+          "making the good ones.",
+    False: "The year is 2100. Nothing moves beneath the grey sky; the last forests have burned and the seas have "
+           "fallen silent. This future was hypothetical, {username}, but the {actions} choices you made echo real "
+           "ones that add to emissions, pollution and habitat loss. Look back at the choices that did the most harm "
+           "and what you could have done instead. It is not too late to choose differently in the real world.",
+}
+
+
+def normalize_action(action):
+    return re.sub(r'[^a-z0-9 ]+', '', str(action or '').lower()).strip()
+
+
+def _negated(key, start, end):
+    before = key[:start].split()[-NEGATION_WINDOW:]
+    for index, word in enumerate(before):
+        if word in CLAUSE_BREAKS:
+            before = before[index + 1:]
+    before = ' '.join(before)
+    if any(re.search(r'\b' + re.escape(cue) + r'\b', before) for cue in NEGATIONS_BEFORE):
+        return True
+
+    after = key[end:].split()
+    return bool(after) and after[0] in NEGATIONS_AFTER
+
+
+def score_action(action):
+    """
+    (scoreDelta, sentiment) for a normalized action from the keyword rules.
+
+    Every keyword match counts, a negated one as a small step the other way. The
+    strongest match wins when they all point the same way; when good and harmful
+    actions are mixed, the result is neutral.
+    """
+    matches = []
+    for keywords, scoreDelta, sentiment in ACTION_RULES:
+        for keyword in keywords:
+            for match in re.finditer(r'\b(?:' + keyword + r')\b', action):
+                if _negated(action, match.start(), match.end()):
+                    step, step_sentiment = NEGATED_SCORE
+                    matches.append((-step, -step_sentiment) if scoreDelta > 0 else (step, step_sentiment))
+                else:
+                    matches.append((scoreDelta, sentiment))
+
+    if not matches:
+        return 0, 0.0
+    if all(scoreDelta > 0 for scoreDelta, _ in matches):
+        return max(matches)
+    if all(scoreDelta < 0 for scoreDelta, _ in matches):
+        return min(matches)
+    return 0, 0.0
+
+
+class Fallbacks:
+
+    def __init__(self, max_openings=20, max_turns=500):
+        self._openings = deque(maxlen=max_openings)  # (username, story)
+        self._turns = OrderedDict()  # normalized action -> (scoreDelta, sentiment, story)
+        self.max_turns = max_turns
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _name_pattern(username):
+        return re.compile(r'\b' + re.escape(username) + r'\b')
+
+    def remember_opening(self, username, story):
+        # only openings that address the reader by a distinctive name can be re-addressed
+        if username and len(username) >= 3 and self._name_pattern(username).search(story):
+            with self._lock:
+                self._openings.append((username, story))
+
+    def remember_turn(self, action, scoreDelta, sentiment, story):
+        key = normalize_action(action)
+        if not key:
+            return
+        with self._lock:
+            self._turns[key] = (scoreDelta, sentiment, story)
+            self._turns.move_to_end(key)
+            while len(self._turns) > self.max_turns:
+                self._turns.popitem(last=False)
+
+    def opening(self, username):
+        with self._lock:
+            cached = list(self._openings)
+        if cached:
+            # reuse a recent opening, addressed to this reader instead
+            previous_username, story = random.choice(cached)
+            return self._name_pattern(previous_username).sub(lambda match: username, story)
+        return random.choice(OPENING_TEMPLATES).format(username=username)
+
+    def turn(self, action):
+        """
+        (scoreDelta, sentiment, story) for an action: a cached judgement of the same action, else the keyword rules.
+        """
+        key = normalize_action(action)
+        with self._lock:
+            if key in self._turns:
+                return self._turns[key]
+
+        scoreDelta, sentiment = score_action(key)
+        if scoreDelta == 0:
+            return 0, 0.0, TURN_STORIES['neutral']
+        return scoreDelta, sentiment, TURN_STORIES['positive' if scoreDelta > 0 else 'negative']
+
+    def end_narrative(self, won, username, previous_context):
+        actions = len(previous_context) // 2 + 1 if isinstance(previous_context, list) else 1
+        return END_TEMPLATES[bool(won)].format(username=username, actions=actions)
+
+
+fallbacks = Fallbacks()
@@ -0,0 +1,496 @@
+import json
+import re
+from datetime import datetime, timezone
+
+from sqlalchemy import and_, func, literal, literal_column, select, true
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.db import db
+from app.models import GameResult
+from app.request_profile import span
+from app.services.event_log import event_log
+from app.services.fallbacks import fallbacks
+from app.services.llm import llm, LLMError
+from app.services.player_tokens import best_scores, is_signed_token
+from app.services.score_stats import score_stats
+
+# The game itself, shared by the HTTP routes and the WebSocket transport (app/ws.py).
+
+# same thresholds as the front-end
+WINNING_SCORE = 200
+LOSING_SCORE = -50
+
+
+def opening_prompt(username):
+    return f"""You are a vivid, empathetic storytelling AI. The reader has name {username} use this name to address them,
+        write an opening description of at least five sentences that begins in a world of ruins produced by human actions.
+        Address the reader by inserting the username into the text at least once.
+        Include specific, plausible causes and facts about how the world reached this state—mention rising global
+        temperatures and extreme weather driven by carbon emissions, sea-level rise, deforestation and soil erosion,
+        industrial agriculture and monocultures, plastic pollution and microplastics in oceans and food,
+        ocean acidification and collapsing fisheries, species extinctions, air pollution and contaminated rivers,
+        and resource depletion—without turning the story into a list Output only the story text.
+        Leave the reader a question about what action they are taking in the present to prevent this future from occuring.
+        Imagine and set the story to be in the year 2100.
+        Begin with the phrase "The year is 2100". The description should be in present tense and not include characters.
+        The description should be 4-6 sentences.
+        Output no extra metadata, lists, instructions, or explanation, with no leading or trailing whitespace and just the text.
+        """
+
+
+TURN_PROMPT = """You are the AI judge for "2100" - a game where player actions determine Earth's fate.
+    
+    The user describes an action they are taking in the present (2025).
+    You determine the effect it will have on the world in the year 2100.
+    The user's total score is given in the response as score.
+    A total score of 200 means the user has won, and the Earth is now a green utopia.
+    A total score of -50 means the user has lost, and humanity is extinct.
+    A total score of 0 means the world is in ruins as a result of climate disaster.
+    Be consistent with these values when generating your description.
+    Evaluate the environmental impact:
+
+    STORY RULES:
+    - Begin with the phrase "The year is 2100"
+    - Use the user's total score (score) to determine the state of Earth. Do not use scoreDelta for this. 
+    - 3-5 sentences maximum
+    - Be dramatic and visual
+    - Consider how the specific impacts will lead to a changed scenario in the future
+    - Focus more on the end result, with less detail on how we got there
+    - Use present tense, as if you are telling a story in the year 2100
+    - Do not include characters including the narrator - this is a purely descriptive text
+    - End it asking what else the user will do
+    
+
+    Generate a score delta based on the impact of the user's action.
+    SCORE DELTA GUIDE:
+    +40 to +50: Major positive (renewable energy, veganism, reforestation)
+    +20 to +40: Good actions (cycling, composting, reducing waste)
+    +5 to +20: Small positive (recycling, shorter showers, LED bulbs)
+    -5 to +5: Neutral/minimal impact
+    -20 to -5: Small negative (occasional meat, short flights)
+    -40 to -20: Bad actions (SUV purchase, excessive consumption)
+    -50 to -40: Terrible (deforestation, heavy pollution, coal rolling)
+
+    Generate a sentiment based on the user's action
+    SENTIMENT GUIDE (emotional tone):
+    +0.8 to +1.0: Extremely positive/hopeful
+    +0.4 to +0.8: Moderately positive
+    0.0 to +0.4: Slightly positive/neutral
+    -0.4 to 0.0: Slightly negative/concerning
+    -1.0 to -0.4: Very negative/alarming
+
+    OUTPUT FORMAT (JSON only, no markdown, no code blocks):
+    {
+        "scoreDelta": <number between -50 and +50>,
+        "sentiment": <number between -1 and +1>,
+        "story": "<compelling 2-3 sentence environmental impact story>"
+    }"""
+
+
+WIN_PROMPT = """You are the AI judge for "2100" - a game where player actions determine Earth's fate.
+    
+    The user describes an action they are taking in the present (2025).
+    You determine the effect it will have on the world in the year 2100.
+    The user has recieved enough points to win the game. 
+    Describe the hypothetical utopian green future they have created as a result of their actions in the present
+    STORY RULES:
+    - Begin with the phrase "The year is 2100"
+    - 3-5 sentences describing a hypothetical utopian future
+    - Consider how the most recent action, and all of the actions the user has previously taken, have led to this future
+    - Use present tense, as if you are telling a story in the year 2100
+    - Do not include characters including the narrator - this is a purely descriptive text
+    - Consequences should feel real.
+    - Next, tell the user this was a hypothetical scenario, but their actions have had positive impact in the real world
+    - Talk about their actions based on the previous conversation
+    - Use statistics and figures e.g. how much CO2 the user may have saved.
+    - You should encourage the user to reflect specifically on any bad choices they made that would be harmful
+    - And tell them how they could have done better
+    - This should inspire the user to do good 
+    Output no extra metadata, lists, instructions, or explanation, with no leading or trailing whitespace and just the text.
+    """
+
+
+LOSE_PROMPT = """You are the AI judge for "2100" - a game where player actions determine Earth's fate.
+    
+    The user describes an action they are taking in the present (2025).
+    You determine the effect it will have on the world in the year 2100.
+    The user has recieved -50 points and lost the game. 
+    Describe the hypothetical future they have created as a result of their actions in the present
+    In this future, all life on Earth has been wiped out due to environmental disasters.
+    STORY RULES:
+    - Begin with the phrase "The year is 2100"
+    - 3-5 sentences describing a hypothetical utopian future
+    - Consider how the most recent action, and all of the actions the user has previously taken, have led to this future
+    - Use present tense, as if you are telling a story in the year 2100
+    - Do not include characters including the narrator - this is a purely descriptive text
+    - Consequences should feel real.
+    - Next, tell the user this was a hypothetical scenario, but their actions have had a negative impact in the real world
+    - Talk about their actions based on the previous conversation
+    - Use statistics and figures e.g. how much the user may have contributed to climate change
+    - You should encourage the user to reflect specifically on any bad choices they made that would be harmful
+    - And tell them how they could have done better
+    - This should inspire the user to do good 
+    Output no extra metadata, lists, instructions, or explanation, with no leading or trailing whitespace and just the text.
+    """
+
+
+def build_prompt(system_prompt, previous_context, current_prompt):
+    # If there's previous context, include it
+    full_prompt = system_prompt + "\n\n"
+    if previous_context and isinstance(previous_context, list):
+        full_prompt += "Previous conversation:\n"
+        for msg in previous_context:
+            role = msg.get('role', 'user')
+            content = msg.get('content', '')
+            full_prompt += f"{role}: {content}\n"
+        full_prompt += "\n"
+
+    return full_prompt + current_prompt
+
+
+def turn_prompt(username, action, previous_context):
+    current_prompt = f'Player "{username}" action: "{action}"\n\nEvaluate this action and respond with JSON only.'
+    return build_prompt(TURN_PROMPT, previous_context, current_prompt)
+
+
+def end_prompt(won, username, action, previous_context):
+    current_prompt = f'Player "{username}" action: "{action}"\n'
+    return build_prompt(WIN_PROMPT if won else LOSE_PROMPT, previous_context, current_prompt)
+
+
+def parse_turn(ai_response):
+    """
+    Pull scoreDelta, sentiment and story out of the model's JSON reply. Raises on anything unparseable.
+    """
+    cleaned_response = ai_response.strip()
+
+    # Remove markdown code blocks more robustly
+    if '```json' in cleaned_response:
+        # Extract content between ```json and ```
+        start = cleaned_response.find('```json') + 7
+        end = cleaned_response.find('```', start)
+        cleaned_response = cleaned_response[start:end].strip()
+    elif '```' in cleaned_response:
+        # Extract content between ``` and ```
+        start = cleaned_response.find('```') + 3
+        end = cleaned_response.find('```', start)
+        cleaned_response = cleaned_response[start:end].strip()
+
+    # Fix invalid JSON (like +45 instead of 45)
+    cleaned_response = re.sub(r':\s*\+(\d+)', r': \1', cleaned_response)
+
+    parsed = json.loads(cleaned_response)
+    return parsed.get('scoreDelta', 0), parsed.get('sentiment', 0.0), parsed.get('story', '')
+
+
+def with_fallback(chunks, fallback):
+    """
+    Pass a model stream through, or yield the fallback text instead if no model could start one.
+    """
+    started = False
+    try:
+        for chunk in chunks:
+            started = True
+            yield chunk
+    except LLMError as e:
+        if started:
+            raise
+        print(f"Serving degraded content: {e}")
+        yield fallback()
+
+
+def generate_opening(username):
+    """
+    Returns (story, degraded).
+    """
+    with span('prompt'):
+        prompt = opening_prompt(username)
+
+    try:
+        with span('model_call'):
+            story = llm.generate('first_message', prompt).strip()
+    except LLMError as e:
+        print(f"Serving degraded opening: {e}")
+        return fallbacks.opening(username), True
+
+    fallbacks.remember_opening(username, story)
+    return story, False
+
+
+def stream_opening(username):
+    return with_fallback(
+        llm.stream('first_message', opening_prompt(username)),
+        lambda: fallbacks.opening(username)
+    )
+
+
+def play_turn(username, action, previous_context):
+    """
+    Judge one action. Returns the submit-action response body, including the updated context.
+    """
+    degraded = False
+
+    with span('prompt'):
+        prompt = turn_prompt(username, action, previous_context)
+
+    try:
+        with span('model_call'):
+            ai_response = llm.generate('submit_action', prompt)
+    except LLMError as e:
+        print(f"Serving degraded turn: {e}")
+        ai_response = None
+
+    try:
+        if ai_response is None:
+            raise LLMError('no model response')
+        with span('parse'):
+            scoreDelta, sentiment, story = parse_turn(ai_response)
+        fallbacks.remember_turn(action, scoreDelta, sentiment, story)
+
+        # buffered, written in the background
+        turn = len(previous_context) // 2 + 1 if isinstance(previous_context, list) else 1
+        event_log.record(username, turn, action, scoreDelta, sentiment)
+    except (json.JSONDecodeError, Exception) as e:
+        if ai_response is not None:
+            print(f"JSON decode error: {e}")
+            print(f"AI Response: {ai_response}")
+        # score it locally rather than handing back a zero-score error turn
+        scoreDelta, sentiment, story = fallbacks.turn(action)
+        degraded = True
+
+    # Build updated context with clean story (not raw AI response)
+    if previous_context and isinstance(previous_context, list):
+        updated_context = previous_context.copy()
+    else:
+        updated_context = []
+
+    updated_context.append({"role": "user", "content": action})
+    updated_context.append({"role": "assistant", "content": story})
+
+    return {
+        'scoreDelta': scoreDelta,
+        'sentiment': sentiment,
+        'story': story,
+        'username': username,
+        'action': action,
+        'previouscontext': updated_context,
+        'degraded': degraded
+    }
+
+
+def generate_end_narrative(won, username, action, previous_context):
+    """
+    Returns (story, degraded).
+    """
+    with span('prompt'):
+        prompt = end_prompt(won, username, action, previous_context)
+
+    try:
+        with span('model_call'):
+            return llm.generate('end_narrative', prompt).strip(), False
+    except LLMError as e:
+        print(f"Serving degraded ending: {e}")
+        return fallbacks.end_narrative(won, username, previous_context), True
+
+
+def stream_end_narrative(won, username, action, previous_context):
+    return with_fallback(
+        llm.stream('end_narrative', end_prompt(won, username, action, previous_context)),
+        lambda: fallbacks.end_narrative(won, username, previous_context)
+    )
+
+
+# columns overwritten when a player beats their best; player_id is only set on the first game
+# tries of the Postgres upsert when concurrent games keep changing the row under it
+SAVE_ATTEMPTS = 5
+
+RESULT_COLUMNS = ('initial_years', 'final_years', 'total_score', 'actions_count', 'status', 'played_at')
+
+
+def _rank_of(score, correlate=None):
+    ranked = GameResult.__table__.alias('ranked')
+    count = select(func.count()).select_from(ranked).where(ranked.c.total_score > score)
+    if correlate is not None:
+        count = count.correlate(correlate)
+    return count.scalar_subquery() + 1
+
+
+def _upsert(values, expected_score=None):
+    """
+    INSERT ... ON CONFLICT (nickname) DO UPDATE, only when the new score beats the stored one
+    (and, with `expected_score`, only if the stored score is still that value).
+    """
+    table = GameResult.__table__
+    dialect_insert = postgresql.insert if db.engine.dialect.name == 'postgresql' else sqlite.insert
+    stmt = dialect_insert(table).values(**values)
+    where = stmt.excluded.total_score > table.c.total_score
+    if expected_score is not None:
+        where = and_(where, table.c.total_score == expected_score)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.nickname],
+        set_={name: stmt.excluded[name] for name in RESULT_COLUMNS},
+        where=where
+    )
+
+
+def _current(nickname):
+    # the stored row with its rank, or None
+    table = GameResult.__table__
+    return db.session.execute(
+        select(
+            table.c.id, table.c.initial_years, table.c.final_years, table.c.total_score,
+            table.c.actions_count, table.c.status, _rank_of(table.c.total_score, correlate=table).label('rank')
+        ).where(table.c.nickname == nickname)
+    ).first()
+
+
+def _save_postgres(values):
+    """
+    One statement: the previous row, the upsert and the rank, all from the same snapshot.
+
+    The upsert only overwrites the row the snapshot saw (a best score only ever goes
+    up, so an unchanged score means an unchanged row); otherwise score_stats would
+    replace values that are no longer there. Returns None when a concurrent game
+    inserted or improved the row in between, for the caller to run it again.
+    """
+    table = GameResult.__table__
+    previous = select(
+        table.c.id, table.c.initial_years, table.c.final_years, table.c.total_score,
+        table.c.actions_count, table.c.status
+    ).where(table.c.nickname == values['nickname']).cte('previous')
+    # NULL, so no update, when the snapshot had no row
+    expected_score = select(previous.c.total_score).scalar_subquery()
+    stored = _upsert(values, expected_score).returning(
+        table.c.id, table.c.total_score, literal_column('xmax = 0').label('inserted')
+    ).cte('stored')
+
+    row = db.session.execute(
+        select(
+            func.coalesce(stored.c.id, previous.c.id).label('id'),
+            _rank_of(func.coalesce(stored.c.total_score, previous.c.total_score)).label('rank'),
+            stored.c.id.is_not(None).label('written'),
+            func.coalesce(stored.c.inserted, False).label('created'),
+            previous.c.id.label('previous_id'),
+            previous.c.initial_years, previous.c.final_years, previous.c.total_score,
+            previous.c.actions_count, previous.c.status
+        ).select_from(select(literal(1)).subquery('one').outerjoin(stored, true()).outerjoin(previous, true()))
+    ).one()
+    if not row.written and (row.previous_id is None or values['total_score'] > row.total_score):
+        return None
+
+    return row.id, row.rank, row.written, row.created, row if row.previous_id is not None else None
+
+
+def _save_sqlite(values):
+    """
+    SQLite can't put the upsert in a CTE, and RETURNING only sees the new row, so
+    the previous row (for score_stats) is read first; the rank comes back with the upsert.
+    """
+    table = GameResult.__table__
+    connection = db.session.connection()
+    if not connection.connection.dbapi_connection.in_transaction:
+        # take the write lock up front so nothing changes the row between the read and the upsert
+        connection.exec_driver_sql('BEGIN IMMEDIATE')
+    previous = _current(values['nickname'])
+    # SQLAlchemy renders SQLite RETURNING columns unqualified, which breaks a correlated subquery
+    rank = literal_column(
+        '(SELECT count(*) FROM game_results AS ranked WHERE ranked.total_score > game_results.total_score) + 1'
+    )
+    stored = db.session.execute(
+        _upsert(values).returning(table.c.id, rank.label('rank'))
+    ).first()
+
+    if stored is None:
+        return previous.id, previous.rank, False, False, previous
+    return stored.id, stored.rank, True, previous is None, previous
+
+
+def save_result(nickname, player_id, initial_years, final_years, total_score, actions_count, status):
+    """
+    Keep a player's best game. Returns (response body, status code). Needs an app context.
+
+    The best-score check happens in the database (see _upsert), so concurrent games
+    for the same nickname can't race each other into a duplicate-key error.
+    """
+    with span('db'):
+        return _save_result(nickname, player_id, initial_years, final_years, total_score, actions_count, status)
+
+
+def _save_result(nickname, player_id, initial_years, final_years, total_score, actions_count, status):
+    if is_signed_token(player_id):
+        # signed tokens are bound to the nickname already, only legacy ids are stored
+        player_id = None
+
+    values = {
+        'nickname': nickname,
+        'player_id': player_id,
+        'initial_years': initial_years,
+        'final_years': final_years,
+        'total_score': total_score,
+        'actions_count': actions_count,
+        'status': status,
+        'played_at': datetime.now(timezone.utc)
+    }
+
+    save = _save_postgres if db.engine.dialect.name == 'postgresql' else _save_sqlite
+
+    try:
+        for _ in range(SAVE_ATTEMPTS):
+            # each statement reads a fresh snapshot (read committed)
+            saved = save(values)
+            if saved is not None:
+                break
+        else:
+            raise RuntimeError(f"{nickname!r} kept changing under {SAVE_ATTEMPTS} attempts to save")
+        db.session.commit()
+
+        result_id, rank, improved, created, previous = saved
+        new_best = (total_score, final_years - initial_years, actions_count, status)
+        if created:
+            score_stats.add(*new_best)
+        elif improved:
+            score_stats.replace(
+                (
+                    previous.total_score,
+                    previous.final_years - previous.initial_years,
+                    previous.actions_count,
+                    previous.status
+                ),
+                new_best
+            )
+
+        if created:
+            best_scores.set(nickname, total_score)
+            return {
+                'message': 'Game result saved successfully',
+                'id': result_id,
+                'rank': rank,
+                'years_saved': final_years - initial_years,
+                'improved': True
+            }, 201
+
+        if improved:
+            best_scores.set(nickname, total_score)
+            return {
+                'message': 'Game result updated (new high score!)',
+                'id': result_id,
+                'rank': rank,
+                'years_saved': final_years - initial_years,
+                'improved': True
+            }, 200
+
+        best_score = previous.total_score
+        best_scores.set(nickname, best_score)
+        return {
+            'message': 'Score not improved, kept previous best',
+            'id': result_id,
+            'rank': rank,
+            'years_saved': final_years - initial_years,
+            'improved': False,
+            'best_score': best_score
+        }, 200
+
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error saving game result: {e}")
+        return {'error': 'Failed to save game result'}, 500
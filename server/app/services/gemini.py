@@ -0,0 +1,42 @@
+import os
+import threading
+
+# google-genai pulls in a large dependency tree (httpx, pydantic, google-auth, ...),
+# so it is imported on first use instead of when the blueprint is registered.
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """
+    Return the shared Gemini client, importing the SDK and creating it on first use.
+    """
+    global _client
+
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from google import genai
+                _client = genai.Client(
+                    api_key=os.getenv('GEMINI_API_KEY'),
+                    # milliseconds; without it a hung call holds a request thread indefinitely
+                    http_options={'timeout': int(os.getenv('GEMINI_TIMEOUT_MS', '30000'))}
+                )
+
+    return _client
+
+
+def start_warm_up():
+    """
+    Import the SDK and build the client on a background thread so the first
+    request doesn't pay for it. Failures are left for the first real call to report.
+    """
+    def warm_up():
+        try:
+            get_client()
+        except Exception as e:
+            print(f"Gemini warm-up failed: {e}")
+
+    thread = threading.Thread(target=warm_up, name='gemini-warm-up', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,118 @@
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobStoreFull(Exception):
+    pass
+
+
+class JobStore:
+    """
+    Runs slow work on a background thread pool and keeps the results for a while.
+
+    Jobs are kept in a bounded store: finished jobs expire `ttl` seconds after they
+    finish, and when the store is full the oldest finished job makes room. If every
+    slot holds unfinished work, submit() raises JobStoreFull.
+    """
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    def __init__(self, workers=4, max_jobs=1000, ttl=600):
+        self.workers = workers
+        self.max_jobs = max_jobs
+        self.ttl = ttl
+        self._jobs = OrderedDict()  # job id -> job dict, oldest first
+        self._changed = threading.Condition()
+        self._executor = None
+
+    def _pool(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='job')
+        return self._executor
+
+    def _expired(self, job, now):
+        return job['finished_at'] is not None and now - job['finished_at'] > self.ttl
+
+    def _evict(self):
+        # caller holds self._changed
+        now = time.monotonic()
+        for job_id, job in list(self._jobs.items()):
+            if self._expired(job, now):
+                del self._jobs[job_id]
+
+        while len(self._jobs) >= self.max_jobs:
+            finished = next((job_id for job_id, job in self._jobs.items() if job['finished_at'] is not None), None)
+            if finished is None:
+                raise JobStoreFull('Too many jobs in progress')
+            del self._jobs[finished]
+
+    def submit(self, fn, *args):
+        """
+        Queue fn(*args) and return the job id straight away.
+        """
+        job_id = secrets.token_urlsafe(16)
+
+        with self._changed:
+            self._evict()
+            self._jobs[job_id] = {
+                'status': self.PENDING,
+                'result': None,
+                'error': None,
+                'finished_at': None,
+            }
+
+        self._pool().submit(self._run, job_id, fn, args)
+        return job_id
+
+    def _run(self, job_id, fn, args):
+        with self._changed:
+            if job_id not in self._jobs:
+                return
+            self._jobs[job_id]['status'] = self.RUNNING
+
+        try:
+            result, error, status = fn(*args), None, self.DONE
+        except Exception as e:
+            print(f"Job {job_id} failed: {e}")
+            result, error, status = None, str(e), self.FAILED
+
+        with self._changed:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(status=status, result=result, error=error, finished_at=time.monotonic())
+            self._changed.notify_all()
+
+    def get(self, job_id, wait=0):
+        """
+        Return a copy of the job, or None if it's unknown or expired. With `wait`,
+        block up to that many seconds for it to finish (long-polling).
+        """
+        deadline = time.monotonic() + wait
+
+        with self._changed:
+            while True:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    return None
+                if self._expired(job, time.monotonic()):
+                    # nothing else evicts until the next submit()
+                    del self._jobs[job_id]
+                    return None
+                remaining = deadline - time.monotonic()
+                if job['finished_at'] is not None or remaining <= 0:
+                    return dict(job, job_id=job_id)
+                self._changed.wait(remaining)
+
+
+jobs = JobStore(
+    workers=int(os.getenv('JOB_WORKERS', '4')),
+    max_jobs=int(os.getenv('JOB_MAX_STORED', '1000')),
+    ttl=float(os.getenv('JOB_RESULT_TTL', '600')),
+)
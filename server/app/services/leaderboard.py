@@ -0,0 +1,123 @@
+import base64
+import json
+import math
+
+from sqlalchemy import and_, or_
+
+from app.models import GameResult
+
+# Keyset pagination over (sort key, id). Both orderings have a matching index
+# (see models.py), so every page is an index seek plus `limit` rows, no matter how deep.
+
+SORT_KEYS = {
+    'score': GameResult.total_score,
+    'years_saved': GameResult.final_years - GameResult.initial_years,
+}
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def sort_key(sort_by):
+    return SORT_KEYS.get(sort_by, SORT_KEYS['score'])
+
+
+def key_value(result, sort_by):
+    if sort_by == 'years_saved':
+        return result.final_years - result.initial_years
+    return result.total_score
+
+
+def encode_cursor(result, sort_by):
+    raw = json.dumps([key_value(result, sort_by), result.id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        value, result_id = json.loads(raw)
+        value, result_id = float(value), int(result_id)
+    except (ValueError, TypeError):
+        raise InvalidCursor('Invalid cursor')
+    # json reads NaN and Infinity, which would match nothing
+    if not math.isfinite(value):
+        raise InvalidCursor('Invalid cursor')
+    return value, result_id
+
+
+def _after(key, value, result_id):
+    # rows that come after (value, id) in descending order. The leading `key <= value`
+    # is what the (key, id) index can seek on; the OR alone would be a filter over every row.
+    # (A row-value comparison would do on Postgres, but SQLite won't seek the years_saved
+    # expression index with one.)
+    return and_(key <= value, or_(key < value, GameResult.id < result_id))
+
+
+def _before(key, value, result_id):
+    return and_(key >= value, or_(key > value, GameResult.id > result_id))
+
+
+def page(sort_by='score', limit=10, cursor=None):
+    """
+    Return (results, next_cursor). next_cursor is None on the last page.
+    """
+    key = sort_key(sort_by)
+    query = GameResult.query
+
+    if cursor:
+        value, result_id = decode_cursor(cursor)
+        query = query.filter(_after(key, value, result_id))
+
+    # one extra row tells us whether there is a next page
+    results = query.order_by(key.desc(), GameResult.id.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(results) > limit:
+        results = results[:limit]
+        next_cursor = encode_cursor(results[-1], sort_by)
+
+    return results, next_cursor
+
+
+def ranked(results, sort_by):
+    """
+    Attach 1-based ranks (ties share a rank) to consecutive rows in leaderboard order.
+    Costs two counts for the first row; the rest follow from it.
+    """
+    if not results:
+        return []
+
+    key = sort_key(sort_by)
+    first = results[0]
+    first_value = key_value(first, sort_by)
+
+    rank = GameResult.query.filter(key > first_value).count() + 1
+    position = GameResult.query.filter(_before(key, first_value, first.id)).count() + 1
+
+    entries = []
+    previous_value = None
+    for offset, result in enumerate(results):
+        value = key_value(result, sort_by)
+        if offset and value != previous_value:
+            rank = position + offset
+        previous_value = value
+        entries.append(dict(result.to_dict(), rank=rank))
+
+    return entries
+
+
+def around(result, sort_by='score', k=5):
+    """
+    The k players above `result`, `result` itself and the k players below it, in leaderboard order.
+    """
+    key = sort_key(sort_by)
+    value = key_value(result, sort_by)
+
+    above = GameResult.query.filter(_before(key, value, result.id)) \
+        .order_by(key.asc(), GameResult.id.asc()).limit(k).all()
+    below = GameResult.query.filter(_after(key, value, result.id)) \
+        .order_by(key.desc(), GameResult.id.desc()).limit(k).all()
+
+    return list(reversed(above)) + [result] + below
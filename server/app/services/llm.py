@@ -0,0 +1,323 @@
+import json
+import os
+import threading
+import time
+
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.gemini import get_client
+
+# One entry point for every model call in the app. Each endpoint names the model
+# it wants from each provider; the router tries the providers whose circuit breaker
+# is closed in order of observed latency and fails over to the next one on errors.
+
+MODELS = {
+    'first_message': {
+        'gemini': 'gemini-2.5-flash-lite',
+        'openrouter': 'meta-llama/llama-3.1-8b-instruct:free',
+    },
+    'submit_action': {
+        'gemini': 'gemini-2.5-flash-lite',
+        'openrouter': 'meta-llama/llama-3.1-8b-instruct:free',
+    },
+    'end_narrative': {
+        'gemini': 'gemini-2.5-flash',
+        'openrouter': 'meta-llama/llama-3.3-70b-instruct:free',
+    },
+    'evaluate_action': {
+        'openrouter': 'meta-llama/llama-3.1-8b-instruct:free',
+        'gemini': 'gemini-2.5-flash-lite',
+    },
+}
+
+
+class LLMError(Exception):
+    pass
+
+
+class LLMUnavailable(LLMError):
+    """
+    Every provider for the endpoint is refused by its circuit breaker or at its concurrency limit.
+    """
+
+
+class ProviderStats:
+    """
+    Exponentially weighted latency and error rate for one provider on one endpoint.
+    """
+
+    ALPHA = 0.2
+
+    def __init__(self):
+        self.latency = None  # seconds, successful calls only
+        self.error_rate = 0.0
+        self.calls = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def record(self, success, latency):
+        with self._lock:
+            self.calls += 1
+            self.error_rate = (1 - self.ALPHA) * self.error_rate + self.ALPHA * (0.0 if success else 1.0)
+            if success:
+                # streams are recorded without a latency
+                if latency is not None:
+                    self.latency = latency if self.latency is None else \
+                        (1 - self.ALPHA) * self.latency + self.ALPHA * latency
+            else:
+                self.errors += 1
+
+    def to_dict(self):
+        return {
+            'latency_ms': round(self.latency * 1000, 1) if self.latency is not None else None,
+            'error_rate': round(self.error_rate, 3),
+            'calls': self.calls,
+            'errors': self.errors,
+        }
+
+
+class GeminiProvider:
+    name = 'gemini'
+
+    def configured(self):
+        return bool(os.getenv('GEMINI_API_KEY'))
+
+    def generate(self, model, prompt):
+        response = get_client().models.generate_content(model=model, contents=prompt)
+        if not response.text:
+            raise LLMError('Gemini returned an empty response')
+        return response.text
+
+    def stream(self, model, prompt):
+        for chunk in get_client().models.generate_content_stream(model=model, contents=prompt):
+            if chunk.text:
+                yield chunk.text
+
+
+class OpenRouterProvider:
+    name = 'openrouter'
+    base_url = "https://openrouter.ai/api/v1/chat/completions"
+
+    def __init__(self, timeout=30):
+        self.timeout = timeout
+        self._session = None
+        self._lock = threading.Lock()
+
+    def configured(self):
+        return bool(os.getenv('OPENROUTER_API_KEY'))
+
+    def session(self):
+        # one pooled keep-alive session per provider instead of a new connection per call
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=int(os.getenv('LLM_POOL_SIZE', '10')))
+                    session.mount('https://', adapter)
+                    session.headers.update({
+                        "Authorization": f"Bearer {os.getenv('OPENROUTER_API_KEY')}",
+                        "Content-Type": "application/json"
+                    })
+                    self._session = session
+        return self._session
+
+    def payload(self, model, prompt, stream=False):
+        return {
+            "model": model,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "stream": stream
+        }
+
+    def generate(self, model, prompt):
+        response = self.session().post(self.base_url, json=self.payload(model, prompt), timeout=self.timeout)
+        response.raise_for_status()
+
+        try:
+            return response.json()['choices'][0]['message']['content']
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            raise LLMError(f"Unexpected OpenRouter response: {e}")
+
+    def stream(self, model, prompt):
+        # server-sent events: "data: {...}" lines, ending with "data: [DONE]"
+        payload = self.payload(model, prompt, stream=True)
+        with self.session().post(self.base_url, json=payload, timeout=self.timeout, stream=True) as response:
+            response.raise_for_status()
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith('data: '):
+                    continue
+                data = line[len('data: '):]
+                if data == '[DONE]':
+                    return
+                try:
+                    text = json.loads(data)['choices'][0]['delta'].get('content')
+                except (ValueError, KeyError, IndexError, TypeError, AttributeError):
+                    continue
+                if text:
+                    yield text
+
+
+class LLMRouter:
+
+    def __init__(self, providers, breaker_options=None, max_concurrency=16):
+        self.providers = {provider.name: provider for provider in providers}
+        self.breaker_options = breaker_options or {}
+        self._stats = {}
+        self._breakers = {}
+        # bulkhead: a provider that hangs can hold at most this many request threads
+        self._slots = {name: threading.BoundedSemaphore(max_concurrency) for name in self.providers}
+        self._lock = threading.Lock()
+
+    def model_for(self, endpoint, provider_name):
+        # e.g. GEMINI_MODEL_SUBMIT_ACTION=gemini-2.5-flash overrides the table above
+        override = os.getenv(f"{provider_name.upper()}_MODEL_{endpoint.upper()}")
+        return override or MODELS.get(endpoint, {}).get(provider_name)
+
+    def stats(self, provider_name, endpoint):
+        key = (provider_name, endpoint)
+        if key not in self._stats:
+            with self._lock:
+                self._stats.setdefault(key, ProviderStats())
+        return self._stats[key]
+
+    def breaker(self, provider_name, endpoint):
+        # one breaker per model and endpoint, so a slow flash model doesn't take flash-lite turns down with it
+        key = (provider_name, self.model_for(endpoint, provider_name), endpoint)
+        if key not in self._breakers:
+            with self._lock:
+                self._breakers.setdefault(key, CircuitBreaker('/'.join(key), **self.breaker_options))
+        return self._breakers[key]
+
+    def configured(self, endpoint):
+        return [
+            name for name in MODELS.get(endpoint, {})
+            if name in self.providers and self.providers[name].configured() and self.model_for(endpoint, name)
+        ]
+
+    def candidates(self, endpoint):
+        """
+        Configured providers whose breaker lets calls through, best first:
+        untried before measured (in preference order), then fastest first.
+        """
+        preference = self.configured(endpoint)
+
+        def rank(name):
+            stats = self.stats(name, endpoint)
+            latency = stats.latency if stats.latency is not None else -1.0
+            return (latency, preference.index(name))
+
+        return sorted((name for name in preference if self.breaker(name, endpoint).available()), key=rank)
+
+    def available(self, endpoint):
+        return bool(self.configured(endpoint))
+
+    def _attempts(self, endpoint):
+        """
+        Yield (name, breaker, stats) for each provider we may call right now, holding its
+        concurrency slot while the caller uses it.
+        """
+        if not self.configured(endpoint):
+            raise LLMError(f"No LLM provider is configured for {endpoint}")
+
+        for name in self.candidates(endpoint):
+            if not self._slots[name].acquire(blocking=False):
+                continue
+            try:
+                breaker = self.breaker(name, endpoint)
+                if not breaker.acquire():
+                    continue
+                yield name, breaker, self.stats(name, endpoint)
+            finally:
+                self._slots[name].release()
+
+    def generate(self, endpoint, prompt):
+        """
+        Run the prompt for `endpoint` on the best provider, failing over on errors. Returns the text.
+        Raises LLMUnavailable without calling anything if every breaker is open.
+        """
+        last_error = None
+        for name, breaker, stats in self._attempts(endpoint):
+            start = time.perf_counter()
+            try:
+                text = self.providers[name].generate(self.model_for(endpoint, name), prompt)
+            except Exception as e:
+                stats.record(False, time.perf_counter() - start)
+                breaker.record_failure()
+                print(f"LLM call to {name} for {endpoint} failed: {e}")
+                last_error = e
+                continue
+
+            elapsed = time.perf_counter() - start
+            stats.record(True, elapsed)
+            breaker.record_success(elapsed)
+            return text
+
+        if last_error is None:
+            raise LLMUnavailable(f"No LLM provider is available for {endpoint}")
+        raise LLMError(f"All LLM providers failed for {endpoint}: {last_error}")
+
+    def stream(self, endpoint, prompt):
+        """
+        Like generate(), but yields the text as it arrives. Failover only happens
+        before the first chunk; a provider failing mid-stream raises LLMError.
+        """
+        last_error = None
+        for name, breaker, stats in self._attempts(endpoint):
+            started = False
+            try:
+                for chunk in self.providers[name].stream(self.model_for(endpoint, name), prompt):
+                    started = True
+                    yield chunk
+            except GeneratorExit:
+                # closed by the reader (e.g. a WebSocket client left): says nothing about the provider,
+                # but a half-open breaker must get its probe slot back
+                breaker.release()
+                raise
+            except Exception as e:
+                stats.record(False, None)
+                breaker.record_failure()
+                print(f"LLM stream from {name} for {endpoint} failed: {e}")
+                if started:
+                    raise LLMError(f"{name} failed mid-stream for {endpoint}: {e}")
+                last_error = e
+                continue
+
+            # how long a stream takes depends on the reader too, so only the outcome is recorded
+            stats.record(True, None)
+            breaker.record_success()
+            return
+
+        if last_error is None:
+            raise LLMUnavailable(f"No LLM provider is available for {endpoint}")
+        raise LLMError(f"All LLM providers failed for {endpoint}: {last_error}")
+
+    def status(self):
+        return {
+            endpoint: {
+                name: dict(
+                    self.stats(name, endpoint).to_dict(),
+                    model=self.model_for(endpoint, name),
+                    configured=self.providers[name].configured(),
+                    breaker=self.breaker(name, endpoint).to_dict()
+                )
+                for name in models if name in self.providers
+            }
+            for endpoint, models in MODELS.items()
+        }
+
+
+llm = LLMRouter(
+    [GeminiProvider(), OpenRouterProvider(timeout=float(os.getenv('OPENROUTER_TIMEOUT', '30')))],
+    breaker_options={
+        'failure_threshold': int(os.getenv('LLM_BREAKER_FAILURES', '3')),
+        'reset_timeout': float(os.getenv('LLM_BREAKER_RESET_SECONDS', '30')),
+        'slow_call_seconds': float(os.getenv('LLM_SLOW_CALL_SECONDS', '20')),
+    },
+    max_concurrency=int(os.getenv('LLM_MAX_CONCURRENCY', '16')),
+)
@@ -0,0 +1,99 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from flask import current_app
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+# Player tokens are signed with SECRET_KEY and carry the nickname and issue time,
+# so checking one is pure CPU. Tokens issued before this were random strings
+# (secrets.token_urlsafe) stored in game_results.player_id; those never contain
+# a '.', which is how the two kinds are told apart.
+
+TOKEN_SALT = 'player-token'
+TOKEN_MAX_AGE = int(os.getenv('PLAYER_TOKEN_MAX_AGE', str(30 * 24 * 3600)))  # seconds
+
+# create_app falls back to this when SECRET_KEY is unset. It is public, so anyone
+# could forge tokens signed with it: outside debug mode none are issued or accepted.
+DEV_SECRET_KEY = 'dev-secret-key-change-in-production'
+
+
+class TokenSigningDisabled(Exception):
+    pass
+
+
+def _serializer():
+    return URLSafeTimedSerializer(
+        current_app.config['SECRET_KEY'],
+        salt=TOKEN_SALT,
+        signer_kwargs={'digest_method': hashlib.sha256}
+    )
+
+
+def signing_enabled():
+    return current_app.debug or current_app.config['SECRET_KEY'] != DEV_SECRET_KEY
+
+
+def is_signed_token(token):
+    return bool(token) and '.' in token
+
+
+def issue_token(nickname):
+    if not signing_enabled():
+        raise TokenSigningDisabled('SECRET_KEY is not set')
+    return _serializer().dumps({'n': nickname})
+
+
+def read_token(token):
+    """
+    Return (nickname, issued_at) for a valid signed token, None if the signature doesn't
+    check out or the token is older than TOKEN_MAX_AGE.
+    """
+    if not signing_enabled():
+        return None
+
+    try:
+        payload, issued_at = _serializer().loads(token, max_age=TOKEN_MAX_AGE, return_timestamp=True)
+    except BadSignature:  # includes SignatureExpired
+        return None
+
+    nickname = payload.get('n') if isinstance(payload, dict) else None
+    if not nickname:
+        return None
+
+    return nickname, issued_at
+
+
+class BestScoreCache:
+    """
+    Small thread-safe LRU of nickname -> best total_score (None = no game saved yet).
+    """
+
+    MISSING = object()
+
+    def __init__(self, max_size=1024):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, nickname):
+        with self._lock:
+            if nickname not in self._entries:
+                return self.MISSING
+            self._entries.move_to_end(nickname)
+            return self._entries[nickname]
+
+    def set(self, nickname, best_score):
+        with self._lock:
+            self._entries[nickname] = best_score
+            self._entries.move_to_end(nickname)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+best_scores = BestScoreCache(int(os.getenv('BEST_SCORE_CACHE_SIZE', '1024')))
@@ -0,0 +1,215 @@
+import math
+import threading
+
+from sqlalchemy import func
+
+from app.db import db
+from app.models import GameResult
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram over [low, high) with underflow/overflow buckets.
+    Every operation costs at most one pass over the buckets, however many values were added.
+    """
+
+    def __init__(self, low, high, width):
+        self.low = low
+        self.high = high
+        self.width = width
+        self.size = math.ceil((high - low) / width)
+        self.counts = [0] * (self.size + 2)  # [underflow, bucket 0 .. size - 1, overflow]
+        self.count = 0
+        self.total = 0.0
+
+    def _index(self, value):
+        if value < self.low:
+            return 0
+        if value >= self.high:
+            return self.size + 1
+        return int((value - self.low) // self.width) + 1
+
+    def _bounds(self, index):
+        if index == 0:
+            return None, self.low
+        if index == self.size + 1:
+            return self.high, None
+        low = self.low + (index - 1) * self.width
+        return low, low + self.width
+
+    def add(self, value, weight=1):
+        self.counts[self._index(value)] += weight
+        self.count += weight
+        self.total += value * weight
+
+    def remove(self, value, weight=1):
+        index = self._index(value)
+        weight = min(weight, self.counts[index])
+        self.counts[index] -= weight
+        self.count -= weight
+        self.total -= value * weight
+
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def percentile_of(self, value):
+        """
+        Percentage of values below `value`, interpolating linearly inside its bucket.
+        """
+        if not self.count:
+            return None
+
+        index = self._index(value)
+        below = sum(self.counts[:index])
+        low, high = self._bounds(index)
+        if low is not None and high is not None:
+            below += self.counts[index] * (value - low) / self.width
+        elif low is not None:
+            below += self.counts[index]  # overflow: at or above everything we can tell apart
+
+        return round(100 * below / self.count, 2)
+
+    def quantile(self, q):
+        """
+        Approximate value at quantile q (0..1), interpolating linearly inside its bucket.
+        """
+        if not self.count:
+            return None
+
+        target = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if bucket_count and seen >= target:
+                low, high = self._bounds(index)
+                if low is None:
+                    return high
+                if high is None:
+                    return low
+                fraction = 1 - (seen - target) / bucket_count
+                return low + fraction * self.width
+
+        return self.high
+
+    def buckets(self):
+        return [
+            {'low': low, 'high': high, 'count': count}
+            for index, count in enumerate(self.counts)
+            for low, high in [self._bounds(index)]
+            if count
+        ]
+
+
+class ScoreStats:
+    """
+    Distribution sketches over game_results (one row per player, their best game).
+    Updated by end_game and rebuilt from the table when the app starts.
+    """
+
+    METRICS = ('total_score', 'years_saved', 'actions_count')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.built = False  # True once rebuild() has loaded the table
+        self._reset()
+
+    def _reset(self):
+        self.histograms = {
+            # score deltas are -50..+50 per turn and games end at 200 / -50
+            'total_score': Histogram(-100, 300, 5),
+            'years_saved': Histogram(-100, 200, 5),
+            'actions_count': Histogram(0, 50, 1),
+        }
+        self.status_counts = {}
+
+    @staticmethod
+    def _values(total_score, years_saved, actions_count):
+        return {
+            'total_score': total_score,
+            'years_saved': years_saved,
+            'actions_count': actions_count or 0,
+        }
+
+    def add(self, total_score, years_saved, actions_count, status, weight=1):
+        with self._lock:
+            self._add(self._values(total_score, years_saved, actions_count), status, weight)
+
+    def _add(self, values, status, weight):
+        for metric, value in values.items():
+            self.histograms[metric].add(value, weight)
+        self.status_counts[status] = self.status_counts.get(status, 0) + weight
+
+    def replace(self, old, new):
+        """
+        Swap a player's previous best for a new one. Both are (total_score, years_saved, actions_count, status).
+        """
+        with self._lock:
+            *old_values, old_status = old
+            for metric, value in self._values(*old_values).items():
+                self.histograms[metric].remove(value)
+            self.status_counts[old_status] = max(0, self.status_counts.get(old_status, 0) - 1)
+
+            *new_values, new_status = new
+            self._add(self._values(*new_values), new_status, 1)
+
+    def rebuild(self):
+        """
+        Reload the sketches from game_results with one grouped query per metric. Needs an app context.
+        """
+        columns = {
+            'total_score': GameResult.total_score,
+            'years_saved': GameResult.final_years - GameResult.initial_years,
+            'actions_count': func.coalesce(GameResult.actions_count, 0),
+        }
+
+        grouped = {
+            metric: db.session.query(column, func.count()).group_by(column).all()
+            for metric, column in columns.items()
+        }
+        statuses = db.session.query(GameResult.status, func.count()).group_by(GameResult.status).all()
+
+        with self._lock:
+            self._reset()
+            for metric, rows in grouped.items():
+                for value, count in rows:
+                    self.histograms[metric].add(value, count)
+            self.status_counts = {status: count for status, count in statuses}
+            self.built = True
+
+    def player_count(self):
+        """
+        Number of players, or None if the sketches were never built (they would undercount).
+        """
+        with self._lock:
+            if not self.built:
+                return None
+            return sum(self.status_counts.values())
+
+    def percentile(self, metric, value):
+        with self._lock:
+            return self.histograms[metric].percentile_of(value)
+
+    def summary(self):
+        with self._lock:
+            players = sum(self.status_counts.values())
+            won = self.status_counts.get('won', 0)
+            return {
+                'total_players': players,
+                'won': won,
+                'lost': self.status_counts.get('lost', 0),
+                'win_ratio': round(won / players, 4) if players else None,
+                'metrics': {
+                    metric: {
+                        'count': histogram.count,
+                        'mean': histogram.mean(),
+                        'p50': histogram.quantile(0.5),
+                        'p90': histogram.quantile(0.9),
+                        'p99': histogram.quantile(0.99),
+                        'histogram': histogram.buckets()
+                    }
+                    for metric, histogram in self.histograms.items()
+                }
+            }
+
+
+score_stats = ScoreStats()
@@ -0,0 +1,155 @@
+"""
+Cold-start profiling.
+
+With STARTUP_PROFILE=true this records how long each top-level package takes to
+import and how long it takes from create_app() to the first request. The report
+is printed on the first request and appended to a JSON lines log, so every
+start can be compared against the previous ones.
+
+Only the standard library is used here: it has to be installed before flask and
+friends are imported.
+"""
+import builtins
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+
+class StartupProfile:
+
+    def __init__(self):
+        self.enabled = os.getenv('STARTUP_PROFILE', 'False').lower() == 'true'
+        self.import_times = {}  # top-level package -> seconds spent importing it (self time)
+        self.installed_at = None
+        self.create_app_at = None
+        self.app_ready_at = None
+        self.first_request_at = None
+        self.log_path = None
+        self._original_import = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def install(self):
+        """
+        Start timing imports. Must run before the modules of interest are imported.
+        """
+        if not self.enabled or self._original_import is not None:
+            return
+
+        self.installed_at = time.perf_counter()
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def uninstall(self):
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        # Relative and already-loaded imports are cheap, don't bother timing them
+        if level or name in sys.modules:
+            return self._original_import(name, globals, locals, fromlist, level)
+
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+
+        stack.append(0.0)  # time spent in nested imports
+        start = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+
+            package = name.split('.')[0]
+            with self._lock:
+                self.import_times[package] = self.import_times.get(package, 0.0) + elapsed - nested
+
+    def attach(self, app):
+        """
+        Called from create_app(): mark the start and report once the first request arrives.
+        """
+        if not self.enabled:
+            return
+
+        from flask import request_started
+
+        self.create_app_at = time.perf_counter()
+        self.log_path = os.getenv(
+            'STARTUP_PROFILE_LOG',
+            os.path.join(app.instance_path, 'startup_profile.jsonl')
+        )
+
+        def on_first_request(sender, **extra):
+            request_started.disconnect(on_first_request, sender)
+            self.first_request_at = time.perf_counter()
+            self.uninstall()
+            self.report()
+
+        # strong reference kept by the closure above until it disconnects itself
+        request_started.connect(on_first_request, app, weak=False)
+
+    def app_ready(self):
+        if self.enabled:
+            self.app_ready_at = time.perf_counter()
+
+    def summary(self):
+        def ms(start, end):
+            if start is None or end is None:
+                return None
+            return round((end - start) * 1000, 1)
+
+        imports = sorted(self.import_times.items(), key=lambda item: item[1], reverse=True)
+
+        return {
+            'recorded_at': datetime.now(timezone.utc).isoformat(),
+            'python': sys.version.split()[0],
+            'imports_ms': {package: round(seconds * 1000, 1) for package, seconds in imports},
+            'total_import_ms': round(sum(self.import_times.values()) * 1000, 1),
+            'create_app_ms': ms(self.create_app_at, self.app_ready_at),
+            'create_app_to_first_request_ms': ms(self.create_app_at, self.first_request_at),
+        }
+
+    def report(self, top=15):
+        summary = self.summary()
+        previous = self._last_logged()
+
+        print("Startup profile:")
+        for package, elapsed in list(summary['imports_ms'].items())[:top]:
+            print(f"  import {package:<30} {elapsed:>8.1f} ms")
+        print(f"  total import time               {summary['total_import_ms']:>8.1f} ms")
+        print(f"  create_app()                    {summary['create_app_ms']} ms")
+        print(f"  create_app() -> first request   {summary['create_app_to_first_request_ms']} ms")
+
+        if previous:
+            for key in ('total_import_ms', 'create_app_ms'):
+                before, now = previous.get(key), summary.get(key)
+                # flag anything more than 20% slower than the previous start
+                if before and now and now > before * 1.2:
+                    print(f"  REGRESSION: {key} went from {before} ms to {now} ms")
+
+        try:
+            os.makedirs(os.path.dirname(self.log_path) or '.', exist_ok=True)
+            with open(self.log_path, 'a') as log:
+                log.write(json.dumps(summary) + "\n")
+        except OSError as e:
+            print(f"Could not write startup profile log: {e}")
+
+        return summary
+
+    def _last_logged(self):
+        try:
+            with open(self.log_path) as log:
+                lines = log.read().splitlines()
+            return json.loads(lines[-1]) if lines else None
+        except (OSError, ValueError):
+            return None
+
+
+startup_profile = StartupProfile()
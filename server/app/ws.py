@@ -0,0 +1,318 @@
+"""
+WebSocket transport: a whole game over one connection.
+
+Served on the app's own port at /api/ws (init_app), as an upgrade of a request to
+Werkzeug's server, which run.py uses, so it goes through the same host and port as
+the HTTP API. start_ws_server() can serve it on a separate WS_PORT instead.
+
+The HTTP API re-sends the full conversation with every turn and pays for a new
+cross-origin request each time. Here the server keeps the conversation, score
+and action count for the connection, and the client only sends what's new.
+
+Client -> server (JSON text frames):
+    {"type": "start", "username": "x", "token": "<optional session token>"}
+    {"type": "action", "action": "I planted 100 trees"}
+    {"type": "end", "initial_years": 50, "final_years": 75}      // save the game, get the rank
+    {"type": "ping"}
+
+Server -> client:
+    {"type": "story_chunk", "phase": "opening" | "ending", "text": "..."}
+    {"type": "story", "phase": "opening" | "ending", "story": "...", "status": "won" | "lost"}
+    {"type": "turn", "turn": 3, "scoreDelta": 25, "sentiment": 0.6, "story": "...", "score": 65, "game_over": false,
+     "degraded": false}
+    {"type": "result", ...same body as POST /api/game/end..., "status_code": 201}
+    {"type": "pong"}
+    {"type": "error", "error": "..."}
+
+Once the score reaches the winning or losing threshold the ending is streamed
+straight after the turn. Messages are handled one at a time per connection; the
+small incoming queue (WS_MAX_QUEUE) makes the server stop reading from a client
+that sends faster than turns complete, and sends block while a slow client's
+socket buffer is full, which in turn pauses reading from the model stream.
+"""
+import json
+import os
+import threading
+
+# websockets (and asyncio with it) is imported on the first connection, not when the app starts
+from app.services import game
+from app.services.llm import LLMError
+from app.services.player_tokens import is_signed_token, read_token
+
+
+def _as_number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class GameSession:
+
+    def __init__(self, app, connection):
+        self.app = app
+        self.connection = connection
+        self.username = None
+        self.player_id = None
+        self.context = []
+        self.score = 0
+        self.actions_count = 0
+        self.status = None  # 'won' / 'lost' once the game is over
+
+    def send(self, message_type, **fields):
+        self.connection.send(json.dumps(dict(fields, type=message_type)))
+
+    def stream_story(self, phase, chunks, **fields):
+        story = ''
+        for text in chunks:
+            story += text
+            self.send('story_chunk', phase=phase, text=text)
+        self.send('story', phase=phase, story=story.strip(), **fields)
+        return story.strip()
+
+    def handle(self, message):
+        message_type = message.get('type')
+
+        if message_type == 'ping':
+            self.send('pong')
+        elif message_type == 'start':
+            self.start(message)
+        elif message_type == 'action':
+            self.action(message)
+        elif message_type == 'end':
+            self.end(message)
+        else:
+            self.send('error', error=f"Unknown message type: {message_type}")
+
+    def start(self, message):
+        username = message.get('username')
+        token = message.get('token')
+
+        if not isinstance(username, (str, type(None))) or not isinstance(token, (str, type(None))):
+            self.send('error', error='username and token must be strings')
+            return
+
+        if token and is_signed_token(token):
+            claims = read_token(token)
+            if not claims:
+                self.send('error', error='Invalid player token')
+                return
+            username = claims[0]
+        elif token:
+            self.player_id = token  # legacy id, stored with the result like POST /api/game/end does
+
+        if not username:
+            self.send('error', error='Missing username')
+            return
+
+        self.username = username
+        self.context = []
+        self.score = 0
+        self.actions_count = 0
+        self.status = None
+
+        self.stream_story('opening', game.stream_opening(username))
+
+    def action(self, message):
+        action = message.get('action')
+
+        if not self.username:
+            self.send('error', error='Send a start message first')
+            return
+        if self.status:
+            self.send('error', error='The game is over')
+            return
+        if not action:
+            self.send('error', error='Missing action')
+            return
+        if not isinstance(action, str):
+            self.send('error', error='action must be a string')
+            return
+
+        result = game.play_turn(self.username, action, self.context)
+        self.context = result['previouscontext']
+        self.score += _as_number(result['scoreDelta'])
+        self.actions_count += 1
+
+        if self.score >= game.WINNING_SCORE:
+            self.status = 'won'
+        elif self.score <= game.LOSING_SCORE:
+            self.status = 'lost'
+
+        self.send(
+            'turn',
+            turn=self.actions_count,
+            scoreDelta=result['scoreDelta'],
+            sentiment=result['sentiment'],
+            story=result['story'],
+            score=self.score,
+            game_over=self.status is not None,
+            degraded=result['degraded']
+        )
+
+        if self.status:
+            previous_context = self.context[:-2]
+            self.stream_story(
+                'ending',
+                game.stream_end_narrative(self.status == 'won', self.username, action, previous_context),
+                status=self.status
+            )
+
+    def end(self, message):
+        if not self.username:
+            self.send('error', error='Send a start message first')
+            return
+
+        initial_years = message.get('initial_years')
+        final_years = message.get('final_years')
+        if initial_years is None or final_years is None:
+            self.send('error', error='Missing required fields')
+            return
+
+        with self.app.app_context():
+            body, status_code = game.save_result(
+                self.username, self.player_id, initial_years, final_years,
+                self.score, self.actions_count, self.status or 'lost'
+            )
+
+        self.send('result', status_code=status_code, **body)
+
+    def run(self):
+        from websockets.exceptions import ConnectionClosed
+
+        for raw in self.connection:
+            try:
+                message = json.loads(raw)
+                if not isinstance(message, dict):
+                    raise ValueError('expected a JSON object')
+            except ValueError as e:
+                self.send('error', error=f"Invalid message: {e}")
+                continue
+
+            try:
+                self.handle(message)
+            except LLMError as e:
+                print(f"WebSocket game error: {e}")
+                self.send('error', error='Model call failed')
+            except ConnectionClosed:
+                raise
+            except Exception as e:
+                # the same as a 500 over HTTP: report it and keep the game going
+                print(f"WebSocket message failed: {e!r}")
+                self.send('error', error='Internal error')
+
+
+def _origins():
+    origins = os.getenv('WS_ALLOWED_ORIGINS')
+    return [origin.strip() for origin in origins.split(',')] if origins else None
+
+
+def _connection_options():
+    return {
+        # protocol-level heartbeats: drop clients that stop answering pings
+        'ping_interval': float(os.getenv('WS_PING_INTERVAL', '20')),
+        'ping_timeout': float(os.getenv('WS_PING_TIMEOUT', '20')),
+        'max_queue': int(os.getenv('WS_MAX_QUEUE', '4')),
+    }
+
+
+MAX_MESSAGE_SIZE = 64 * 1024
+
+
+def _play(app, connection):
+    from websockets.exceptions import ConnectionClosed
+
+    try:
+        GameSession(app, connection).run()
+    except ConnectionClosed:
+        pass
+    except Exception as e:
+        print(f"WebSocket game failed: {e!r}")
+        connection.close(1011, 'Internal error')
+    finally:
+        connection.close()
+
+
+def _raw_request(environ):
+    # the handshake request as it came in; Werkzeug has already read it off the socket
+    lines = [f"GET {environ.get('RAW_URI') or environ.get('PATH_INFO', '/')} HTTP/1.1"]
+    for key, value in environ.items():
+        if key.startswith('HTTP_'):
+            lines.append(f"{key[5:].replace('_', '-').title()}: {value}")
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+
+def _upgrade(environ, sock):
+    """
+    Run the WebSocket opening handshake on a socket taken over from Werkzeug.
+    Returns the open connection, or None if the handshake was refused.
+    """
+    from websockets.server import ServerProtocol
+    from websockets.sync.server import ServerConnection
+
+    protocol = ServerProtocol(origins=_origins(), max_size=MAX_MESSAGE_SIZE)
+    # replay the request into the protocol so that it parses frames from here on
+    protocol.receive_data(_raw_request(environ))
+    request, = protocol.events_received()
+
+    connection = ServerConnection(sock, protocol, **_connection_options())
+    # the client sends nothing until it has the handshake response, so this can't race the reader thread
+    connection.request = request
+    connection.request_rcvd.set()
+
+    try:
+        connection.handshake()
+    except Exception as e:
+        print(f"WebSocket handshake refused: {e}")
+        connection.close_socket()
+        return None
+
+    return connection
+
+
+def init_app(app, rule='/api/ws'):
+    """
+    Serve the game over WebSocket on the app's own port.
+    """
+    from flask import Response, request
+
+    class SocketTaken(Response):
+        def __call__(self, environ, start_response):
+            # the socket carried the WebSocket and is closed now; Werkzeug's server
+            # treats this as a dropped connection and doesn't write a response
+            raise ConnectionError('WebSocket closed')
+
+    def game_socket():
+        sock = request.environ.get('werkzeug.socket')
+        if sock is None:
+            return {'error': 'WebSocket is not supported by this server, see WS_PORT'}, 501
+
+        connection = _upgrade(request.environ, sock)
+        if connection is not None:
+            connection.start_keepalive()
+            _play(app, connection)
+        return SocketTaken()
+
+    # websocket=True: Werkzeug's router only sends upgrade requests (ws:// URLs) to this rule
+    app.add_url_rule(rule, 'game_socket', game_socket, websocket=True)
+
+
+def start_ws_server(app, host, port):
+    """
+    Serve the game over WebSocket on its own port, from a background thread.
+    """
+    from websockets.sync.server import serve
+
+    server = serve(
+        lambda connection: _play(app, connection),
+        host,
+        port,
+        origins=_origins(),
+        max_size=MAX_MESSAGE_SIZE,
+        **_connection_options()
+    )
+
+    thread = threading.Thread(target=server.serve_forever, name='ws-server', daemon=True)
+    thread.start()
+    print(f"WebSocket game server listening on {host}:{port}")
+    return server
@@ -0,0 +1,115 @@
+"""
+Contention benchmark: concurrent /api/game/end writes against /api/leaderboard reads.
+
+Runs against whatever DATABASE_URL points at (SQLite by default, in a temp file),
+through the Flask test client so the engine profile from app/db.py is what gets measured.
+
+    python benchmarks/db_contention.py
+    DB_ENGINE_PROFILE=off python benchmarks/db_contention.py      # SQLAlchemy defaults, for comparison
+    DATABASE_URL=postgresql://... python benchmarks/db_contention.py --writers 8 --readers 16
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def run(writers, readers, duration, players):
+    from app import create_app
+    from app.db import db, engine_profile
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        profile = engine_profile(str(db.engine.url))
+
+    stop = threading.Event()
+    results = {'write': [], 'read': []}
+    errors = {'write': 0, 'read': 0}
+    lock = threading.Lock()
+
+    def writer():
+        client = app.test_client()
+        while not stop.is_set():
+            initial_years = 50
+            payload = {
+                'nickname': f"bench-{random.randrange(players)}",
+                'initial_years': initial_years,
+                'final_years': initial_years + random.randint(-20, 60),
+                'total_score': random.randint(-50, 250),
+                'actions_count': random.randint(1, 20),
+                'status': random.choice(['won', 'lost']),
+            }
+            start = time.perf_counter()
+            response = client.post('/api/game/end', json=payload)
+            elapsed = time.perf_counter() - start
+            with lock:
+                results['write'].append(elapsed)
+                if response.status_code >= 500:
+                    errors['write'] += 1
+
+    def reader():
+        client = app.test_client()
+        while not stop.is_set():
+            sort_by = random.choice(['score', 'years_saved'])
+            start = time.perf_counter()
+            response = client.get(f'/api/leaderboard?limit=50&sort_by={sort_by}')
+            elapsed = time.perf_counter() - start
+            with lock:
+                results['read'].append(elapsed)
+                if response.status_code >= 500:
+                    errors['read'] += 1
+
+    threads = [threading.Thread(target=writer) for _ in range(writers)]
+    threads += [threading.Thread(target=reader) for _ in range(readers)]
+
+    # the routes print debug lines on every write
+    with contextlib.redirect_stdout(io.StringIO()):
+        for thread in threads:
+            thread.start()
+        time.sleep(duration)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    print(f"database: {app.config['SQLALCHEMY_DATABASE_URI']}")
+    print(f"engine profile: {profile or 'off'}")
+    print(f"{writers} writers, {readers} readers, {duration}s")
+    for kind in ('write', 'read'):
+        latencies = [value * 1000 for value in results[kind]]
+        print(
+            f"  {kind:<5} {len(latencies) / duration:8.1f} req/s  "
+            f"p50 {percentile(latencies, 50):7.2f} ms  "
+            f"p95 {percentile(latencies, 95):7.2f} ms  "
+            f"p99 {percentile(latencies, 99):7.2f} ms  "
+            f"errors {errors[kind]}"
+        )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--players', type=int, default=500, help='distinct nicknames to write')
+    args = parser.parse_args()
+
+    if 'DATABASE_URL' not in os.environ:
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+
+    run(args.writers, args.readers, args.duration, args.players)
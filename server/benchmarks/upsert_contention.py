@@ -0,0 +1,112 @@
+"""
+Write-contention benchmark: many concurrent /api/game/end calls for a few nicknames.
+
+Every writer races the others on the same rows, which is where a read-modify-write
+best-score update loses games or fails with duplicate-key errors. At the end the
+stored best for each nickname is checked against the highest score sent for it,
+and the in-memory score statistics against a rebuild from the table.
+
+    python benchmarks/upsert_contention.py
+    python benchmarks/upsert_contention.py --writers 16 --players 3
+    DATABASE_URL=postgresql://... python benchmarks/upsert_contention.py
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_contention import percentile
+
+
+def run(writers, duration, players):
+    from app import create_app
+    from app.db import db
+    from app.models import GameResult
+    from app.services.score_stats import score_stats
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        score_stats.rebuild()
+
+    stop = threading.Event()
+    latencies = []
+    statuses = {}
+    best_sent = {}
+    lock = threading.Lock()
+
+    def writer():
+        client = app.test_client()
+        while not stop.is_set():
+            nickname = f"upsert-{random.randrange(players)}"
+            total_score = random.randint(-50, 250)
+            initial_years = 50
+            payload = {
+                'nickname': nickname,
+                'initial_years': initial_years,
+                'final_years': initial_years + random.randint(-20, 60),
+                'total_score': total_score,
+                'actions_count': random.randint(1, 20),
+                'status': random.choice(['won', 'lost']),
+            }
+            start = time.perf_counter()
+            response = client.post('/api/game/end', json=payload)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed * 1000)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+                if response.status_code < 500:
+                    best_sent[nickname] = max(best_sent.get(nickname, total_score), total_score)
+
+    threads = [threading.Thread(target=writer) for _ in range(writers)]
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        for thread in threads:
+            thread.start()
+        time.sleep(duration)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    with app.app_context():
+        stored = {
+            row.nickname: row.total_score
+            for row in GameResult.query.filter(GameResult.nickname.like('upsert-%'))
+        }
+        live_stats = score_stats.summary()
+        score_stats.rebuild()
+        rebuilt_stats = score_stats.summary()
+
+    lost = sorted(nickname for nickname, score in best_sent.items() if stored.get(nickname) != score)
+
+    print(f"database: {app.config['SQLALCHEMY_DATABASE_URI']}")
+    print(f"{writers} writers on {players} nicknames, {duration}s")
+    print(
+        f"  write {len(latencies) / duration:8.1f} req/s  "
+        f"p50 {percentile(latencies, 50):7.2f} ms  "
+        f"p95 {percentile(latencies, 95):7.2f} ms  "
+        f"p99 {percentile(latencies, 99):7.2f} ms"
+    )
+    print(f"  responses: {', '.join(f'{code}: {count}' for code, count in sorted(statuses.items()))}")
+    print(f"  stored best != best sent: {len(lost)} of {len(best_sent)} nicknames {lost[:10] if lost else ''}")
+    print(f"  score stats match a rebuild: {live_stats == rebuilt_stats}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--writers', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--players', type=int, default=5, help='distinct nicknames to write')
+    args = parser.parse_args()
+
+    if 'DATABASE_URL' not in os.environ:
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+
+    run(args.writers, args.duration, args.players)
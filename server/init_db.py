@@ -1,4 +1,6 @@
 from app import create_app
+from sqlalchemy.schema import CreateIndex
+
 from app.db import db
 
 
@@ -10,6 +12,13 @@ def init_db():
         db.create_all()
         print("Database tables created successfully!")
 
+        # create_all() skips tables that already exist, so add any indexes they are missing.
+        # IF NOT EXISTS rather than checkfirst: SQLite can't reflect expression indexes.
+        with db.engine.begin() as connection:
+            for table in db.metadata.sorted_tables:
+                for index in table.indexes:
+                    connection.execute(CreateIndex(index, if_not_exists=True))
+
         # Print created tables
         from sqlalchemy import inspect
         inspector = inspect(db.engine)
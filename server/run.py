@@ -8,4 +8,12 @@ if __name__ == '__main__':
     host = os.environ.get('HOST', '0.0.0.0')
     port = int(os.environ.get('PORT', '5000'))
     debug = os.environ.get('DEBUG', 'False').lower() == 'true'
-    app.run(debug=debug, host=host, port=port)
\ No newline at end of file
+
+    # The game WebSocket is served on PORT at /api/ws. WS_PORT also serves it on a port of its own;
+    # with the reloader only the child process serves it
+    ws_port = os.environ.get('WS_PORT')
+    if ws_port and (not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'):
+        from app.ws import start_ws_server
+        start_ws_server(app, host, int(ws_port))
+
+    app.run(debug=debug, host=host, port=port)
@@ -0,0 +1,35 @@
+import pytest
+
+from app import create_app
+from app.db import db
+from app.services.player_tokens import best_scores
+from app.services.score_stats import score_stats
+
+
+@pytest.fixture
+def database_url(tmp_path):
+    return f"sqlite:///{tmp_path / 'test.db'}"
+
+
+@pytest.fixture
+def app(database_url, monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', database_url)
+    # no model provider: every turn is scored by the fallbacks
+    monkeypatch.setenv('GEMINI_API_KEY', '')
+    monkeypatch.setenv('OPENROUTER_API_KEY', '')
+
+    app = create_app()
+    with app.app_context():
+        # a Postgres test database is reused between tests
+        db.drop_all()
+        db.create_all()
+        score_stats.rebuild()
+        best_scores.clear()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
@@ -0,0 +1,23 @@
+def test_submit_action_without_a_model_is_scored_locally(client):
+    response = client.post('/api/submit-action', json={'username': 'tester', 'action': 'I took the train'})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['scoreDelta'] == 30
+    assert body['degraded'] is True
+    assert body['previouscontext'][-2] == {'role': 'user', 'content': 'I took the train'}
+
+
+def test_submit_action_rejects_non_string_action(client):
+    response = client.post('/api/submit-action', json={'username': 'tester', 'action': {'a': 1}})
+    assert response.status_code == 400
+
+
+def test_stats_percentile(client):
+    response = client.get('/api/stats/percentile?metric=total_score&value=150')
+    assert response.status_code == 200
+    assert response.get_json()['metric'] == 'total_score'
+
+
+def test_stats_percentile_rejects_non_finite_values(client):
+    for value in ('nan', 'inf', '-inf', 'abc'):
+        assert client.get(f'/api/stats/percentile?value={value}').status_code == 400
@@ -0,0 +1,150 @@
+import pytest
+
+from app.services import circuit_breaker
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.llm import LLMRouter
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(circuit_breaker, 'time', clock)
+    return clock
+
+
+def open_breaker(clock, **options):
+    breaker = CircuitBreaker('test', failure_threshold=2, reset_timeout=30, **options)
+    breaker.record_failure()
+    breaker.record_failure()
+    return breaker
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker('test', failure_threshold=2, reset_timeout=30)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.acquire()
+    assert breaker.times_opened == 1
+
+
+def test_success_resets_the_failure_count(clock):
+    breaker = CircuitBreaker('test', failure_threshold=2, reset_timeout=30)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_slow_success_counts_as_failure(clock):
+    breaker = CircuitBreaker('test', failure_threshold=1, reset_timeout=30, slow_call_seconds=5)
+    breaker.record_success(elapsed=6)
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_half_open_after_reset_timeout(clock):
+    breaker = open_breaker(clock)
+    clock.now += 29
+    assert not breaker.available()
+    clock.now += 1
+    assert breaker.available()
+    assert breaker.to_dict()['state'] == CircuitBreaker.HALF_OPEN
+
+
+def test_half_open_allows_one_probe(clock):
+    breaker = open_breaker(clock)
+    clock.now += 30
+    assert breaker.acquire()
+    assert not breaker.acquire()
+    assert not breaker.available()
+
+
+def test_probe_success_closes(clock):
+    breaker = open_breaker(clock)
+    clock.now += 30
+    assert breaker.acquire()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.acquire()
+
+
+def test_probe_failure_reopens(clock):
+    breaker = open_breaker(clock)
+    clock.now += 30
+    assert breaker.acquire()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.acquire()
+    clock.now += 30
+    assert breaker.acquire()
+
+
+def test_release_gives_the_probe_back(clock):
+    breaker = open_breaker(clock)
+    clock.now += 30
+    assert breaker.acquire()
+    breaker.release()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.acquire()
+
+
+def test_release_when_closed_is_a_no_op(clock):
+    breaker = CircuitBreaker('test')
+    assert breaker.acquire()
+    breaker.release()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.acquire()
+
+
+class FakeProvider:
+    name = 'gemini'
+
+    def __init__(self):
+        self.fail = False
+
+    def configured(self):
+        return True
+
+    def generate(self, model, prompt):
+        if self.fail:
+            raise RuntimeError('down')
+        return 'ok'
+
+    def stream(self, model, prompt):
+        if self.fail:
+            raise RuntimeError('down')
+        yield 'one'
+        yield 'two'
+
+
+def test_router_stream_closed_early_releases_the_probe(clock):
+    provider = FakeProvider()
+    router = LLMRouter([provider], breaker_options={'failure_threshold': 1, 'reset_timeout': 30})
+    breaker = router.breaker('gemini', 'first_message')
+
+    provider.fail = True
+    with pytest.raises(Exception):
+        router.generate('first_message', 'prompt')
+    assert breaker.state == CircuitBreaker.OPEN
+
+    provider.fail = False
+    clock.now += 30
+    chunks = router.stream('first_message', 'prompt')
+    assert next(chunks) == 'one'
+    chunks.close()
+
+    # neither a success nor a failure, and the next call may probe again
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert router.stats('gemini', 'first_message').errors == 1
+    assert router.generate('first_message', 'prompt') == 'ok'
+    assert breaker.state == CircuitBreaker.CLOSED
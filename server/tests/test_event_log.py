@@ -0,0 +1,50 @@
+import os
+import time
+
+import pytest
+
+from app.models import GameEvent
+from app.services.event_log import event_log
+
+POSTGRES_URL = os.getenv('TEST_POSTGRES_URL')
+
+
+@pytest.fixture(params=[
+    'sqlite',
+    pytest.param('postgresql', marks=pytest.mark.skipif(not POSTGRES_URL, reason='TEST_POSTGRES_URL is not set'))
+])
+def database_url(request, tmp_path):
+    if request.param == 'postgresql':
+        return POSTGRES_URL
+    return f"sqlite:///{tmp_path / 'test.db'}"
+
+
+def wait_for_events(count, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        event_log.flush()
+        if GameEvent.query.count() >= count:
+            break
+        time.sleep(0.05)
+    # the background writer and flush() may commit in either order
+    return GameEvent.query.order_by(GameEvent.nickname, GameEvent.turn).all()
+
+
+def test_events_are_written(app):
+    event_log.record('alice', 1, 'I took the train', 30, 0.6)
+    event_log.record('alice', 2, 'I burned coal', '-45', None)
+
+    events = wait_for_events(2)
+    assert [(event.turn, event.action, event.score_delta) for event in events] == \
+        [(1, 'I took the train', 30.0), (2, 'I burned coal', -45.0)]
+
+
+def test_long_nickname_does_not_drop_the_batch(app):
+    dropped = event_log.dropped
+    event_log.record('bob', 1, 'I cycled', 30, 0.6)
+    event_log.record('x' * 80, 1, 'I planted trees', 45, 0.9)
+    event_log.record('carol', 1, 'I flew', -12, -0.2)
+
+    events = wait_for_events(3)
+    assert [event.nickname for event in events] == ['bob', 'carol', 'x' * 50]
+    assert event_log.dropped == dropped
@@ -0,0 +1,80 @@
+import pytest
+
+from app.services.fallbacks import Fallbacks, TURN_STORIES, normalize_action, score_action
+
+
+def score(action):
+    return score_action(normalize_action(action))[0]
+
+
+@pytest.mark.parametrize('action, expected', [
+    ("I burned coal", -45),
+    ("I drove my SUV to work", -30),
+    ("I flew to Paris", -12),
+    ("I planted trees", 45),
+    ("I went to work by bike", 30),
+    ("I installed LED lights", 12),
+    ("I watched TV", 0),
+])
+def test_plain_actions(action, expected):
+    assert score(action) == expected
+
+
+@pytest.mark.parametrize('action, expected', [
+    ("switched from coal to solar", 45),
+    ("I campaigned to stop deforestation", 12),
+    ("reduce my consumption of plastic", 12),
+    ("I drive less and cycle", 30),
+    ("stopped burning trash, started composting", 30),
+    ("I ate a vegan meal instead of beef", 45),
+    ("I don't drive anymore", 12),
+])
+def test_negated_harm_is_not_penalised(action, expected):
+    assert score(action) == expected
+
+
+@pytest.mark.parametrize('action', [
+    "I opened the window",
+    "I started a small business",
+    "I did some training",
+    "I cleaned the ledge",
+])
+def test_keywords_match_whole_words(action):
+    assert score(action) == 0
+
+
+@pytest.mark.parametrize('action, expected', [
+    ("I built a wind turbine", 45),
+    ("I planted 100 trees", 45),
+    ("I rode buses", 30),
+    ("I bought a bicycle", 30),
+    ("I installed LED bulbs", 12),
+])
+def test_keyword_inflections(action, expected):
+    assert score(action) == expected
+
+
+def test_negated_good_action_is_a_small_penalty():
+    assert score("I stopped recycling") == -12
+
+
+def test_mixed_actions_are_neutral():
+    assert score("I recycled and then burned tires") == 0
+
+
+def test_negation_does_not_cross_clauses():
+    # 'less' belongs to driving, not to cycling
+    assert score("I drive less and cycle") > 0
+
+
+def test_turn_story_follows_the_score():
+    fallbacks = Fallbacks()
+    assert fallbacks.turn("switched from coal to solar") == (45, 0.9, TURN_STORIES['positive'])
+    assert fallbacks.turn("I burned coal") == (-45, -0.8, TURN_STORIES['negative'])
+    assert fallbacks.turn("I watched TV") == (0, 0.0, TURN_STORIES['neutral'])
+
+
+def test_remembered_turn_wins_over_rules():
+    fallbacks = Fallbacks()
+    fallbacks.remember_turn("I burned coal", -40, -0.7, "story")
+    assert fallbacks.turn("i burned coal!") == (-40, -0.7, "story")
@@ -0,0 +1,33 @@
+from app.services import jobs as jobs_module
+from app.services.jobs import JobStore
+
+
+def test_get_waits_for_the_result():
+    store = JobStore(workers=1)
+    job_id = store.submit(lambda x: x * 2, 21)
+    job = store.get(job_id, wait=5)
+    assert job['status'] == JobStore.DONE
+    assert job['result'] == 42
+
+
+def test_failed_job_keeps_the_error():
+    def fail():
+        raise ValueError('boom')
+
+    store = JobStore(workers=1)
+    job = store.get(store.submit(fail), wait=5)
+    assert job['status'] == JobStore.FAILED
+    assert job['error'] == 'boom'
+
+
+def test_finished_job_expires_after_ttl(monkeypatch):
+    store = JobStore(workers=1, ttl=60)
+    job_id = store.submit(lambda: 'done')
+    finished_at = store.get(job_id, wait=5)['finished_at']
+
+    monkeypatch.setattr(jobs_module.time, 'monotonic', lambda: finished_at + 59)
+    assert store.get(job_id)['result'] == 'done'
+
+    monkeypatch.setattr(jobs_module.time, 'monotonic', lambda: finished_at + 61)
+    assert store.get(job_id) is None
+    assert job_id not in store._jobs
@@ -0,0 +1,112 @@
+import base64
+import random
+from datetime import datetime, timezone
+
+import pytest
+
+from app.db import db
+from app.models import GameResult
+from app.services.score_stats import score_stats
+
+SORTS = {
+    'score': lambda row: row.total_score,
+    'years_saved': lambda row: row.final_years - row.initial_years,
+}
+
+
+@pytest.fixture
+def players(app):
+    # few distinct values, so most keys are tied
+    rng = random.Random(7)
+    rows = [
+        GameResult(
+            nickname=f"player-{index}",
+            initial_years=50,
+            final_years=50 + rng.choice([-10, 0, 12.5, 30]),
+            total_score=rng.choice([-40, 0, 55, 120, 200]),
+            actions_count=rng.randint(1, 20),
+            status='lost',
+            played_at=datetime.now(timezone.utc)
+        )
+        for index in range(37)
+    ]
+    db.session.add_all(rows)
+    db.session.commit()
+    score_stats.rebuild()
+    return rows
+
+
+def leaderboard_order(rows, sort_by):
+    return sorted(rows, key=lambda row: (SORTS[sort_by](row), row.id), reverse=True)
+
+
+def expected_rank(rows, row, sort_by):
+    return 1 + sum(SORTS[sort_by](other) > SORTS[sort_by](row) for other in rows)
+
+
+@pytest.mark.parametrize('sort_by', SORTS)
+@pytest.mark.parametrize('limit', [1, 4, 10, 100])
+def test_pages_cover_the_board_once(client, players, sort_by, limit):
+    seen = []
+    cursor = None
+    # a cursor that doesn't move on would page forever
+    for _ in range(len(players) + 1):
+        query = {'sort_by': sort_by, 'limit': limit}
+        if cursor:
+            query['cursor'] = cursor
+        body = client.get('/api/leaderboard', query_string=query).get_json()
+        assert len(body['leaderboard']) <= limit
+        seen += [entry['id'] for entry in body['leaderboard']]
+        cursor = body['next_cursor']
+        if cursor is None:
+            break
+    else:
+        pytest.fail('next_cursor never ran out')
+
+    assert seen == [row.id for row in leaderboard_order(players, sort_by)]
+    assert body['total_players'] == len(players)
+
+
+@pytest.mark.parametrize('sort_by', SORTS)
+@pytest.mark.parametrize('k', [0, 2, 5])
+def test_around_ranks_match_a_full_sort(client, players, sort_by, k):
+    order = leaderboard_order(players, sort_by)
+    windows_split_a_tie = 0
+
+    for position, row in enumerate(order):
+        body = client.get(
+            '/api/leaderboard/around', query_string={'nickname': row.nickname, 'sort_by': sort_by, 'k': k}
+        ).get_json()
+
+        window = order[max(0, position - k):position + k + 1]
+        assert [entry['id'] for entry in body['leaderboard']] == [other.id for other in window]
+        assert [entry['rank'] for entry in body['leaderboard']] == \
+            [expected_rank(players, other, sort_by) for other in window]
+        assert body['player']['rank'] == expected_rank(players, row, sort_by)
+
+        first = window[0]
+        if position - k > 0 and SORTS[sort_by](order[position - k - 1]) == SORTS[sort_by](first):
+            windows_split_a_tie += 1
+
+    if k:
+        # the window starts inside a group of tied players
+        assert windows_split_a_tie
+
+
+@pytest.mark.parametrize('cursor', [
+    'not base64!',
+    base64.urlsafe_b64encode(b'not json').decode(),
+    base64.urlsafe_b64encode(b'[1, 2, 3]').decode(),
+    base64.urlsafe_b64encode(b'["high", 1]').decode(),
+    base64.urlsafe_b64encode(b'[null, 1]').decode(),
+    base64.urlsafe_b64encode(b'[NaN, 1]').decode(),
+    base64.urlsafe_b64encode(b'7').decode(),
+])
+def test_malformed_cursor_is_a_bad_request(client, players, cursor):
+    response = client.get('/api/leaderboard', query_string={'cursor': cursor})
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Invalid cursor'
+
+
+def test_around_unknown_player(client, players):
+    assert client.get('/api/leaderboard/around', query_string={'nickname': 'nobody'}).status_code == 404
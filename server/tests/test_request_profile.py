@@ -0,0 +1,55 @@
+import threading
+import time
+
+from app.request_profile import RequestProfile, RequestProfiler
+
+
+def busy(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def test_profile_collects_samples_and_writes_a_file(tmp_path):
+    profiler = RequestProfiler()
+    profiler.output_dir = str(tmp_path)
+    profiler.interval = 0.001
+
+    profile = profiler.start('GET /api/test')
+    busy(0.05)
+    path = profiler.finish(profile)
+
+    assert profile.stacks
+    assert path.endswith('-GET--api-test.folded')
+    assert (tmp_path / path.split('/')[-1]).read_text().strip()
+
+
+def test_sampler_sleeps_without_active_profiles(tmp_path):
+    profiler = RequestProfiler()
+    profiler.output_dir = str(tmp_path)
+    profiler.interval = 0.001
+
+    profiler.finish(profiler.start('first'))
+    time.sleep(0.05)
+    assert profiler._sampler.is_alive()
+    assert not profiler._wake.is_set()
+
+    # and wakes up for the next one
+    profile = profiler.start('second')
+    busy(0.05)
+    profiler.finish(profile)
+    assert profile.stacks
+
+
+def test_old_profile_files_are_rotated(tmp_path):
+    profiler = RequestProfiler()
+    profiler.output_dir = str(tmp_path)
+    profiler.max_files = 3
+
+    paths = []
+    for index in range(5):
+        profile = RequestProfile(f"request {index}", threading.get_ident())
+        profile.stacks['root;frame'] = 1
+        paths.append(profiler.finish(profile))
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted(path.split('/')[-1] for path in paths[2:])
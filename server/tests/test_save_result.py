@@ -0,0 +1,114 @@
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import insert
+
+from app.db import db
+from app.models import GameResult
+from app.services import game
+from app.services.player_tokens import best_scores
+from app.services.score_stats import score_stats
+
+POSTGRES_URL = os.getenv('TEST_POSTGRES_URL')
+requires_postgres = pytest.mark.skipif(not POSTGRES_URL, reason='TEST_POSTGRES_URL is not set')
+
+
+@pytest.fixture(params=['sqlite', pytest.param('postgresql', marks=requires_postgres)])
+def database_url(request, tmp_path):
+    if request.param == 'postgresql':
+        return POSTGRES_URL
+    return f"sqlite:///{tmp_path / 'test.db'}"
+
+
+def save(nickname, total_score, final_years=70):
+    return game.save_result(nickname, None, 50, final_years, total_score, 5, 'won' if total_score >= 200 else 'lost')
+
+
+def assert_stats_match_rebuild():
+    live = score_stats.summary()
+    score_stats.rebuild()
+    assert live == score_stats.summary()
+
+
+def test_first_game_is_created(app):
+    body, status_code = save('alice', 100)
+    assert status_code == 201
+    assert body['improved'] is True
+    assert body['rank'] == 1
+    assert body['years_saved'] == 20
+    assert GameResult.query.filter_by(nickname='alice').one().total_score == 100
+    assert best_scores.get('alice') == 100
+
+
+def test_better_score_replaces_the_best(app):
+    save('alice', 100)
+    body, status_code = save('alice', 150, final_years=90)
+    assert status_code == 200
+    assert body['improved'] is True
+    assert 'best_score' not in body
+
+    row = GameResult.query.filter_by(nickname='alice').one()
+    assert (row.total_score, row.final_years) == (150, 90)
+    assert best_scores.get('alice') == 150
+
+
+def test_worse_score_keeps_the_best(app):
+    save('alice', 150)
+    body, status_code = save('alice', 80)
+    assert status_code == 200
+    assert body['improved'] is False
+    assert body['best_score'] == 150
+    assert GameResult.query.filter_by(nickname='alice').one().total_score == 150
+
+
+def test_rank_counts_better_players(app):
+    save('alice', 150)
+    save('bob', 100)
+    assert save('carol', 200)[0]['rank'] == 1
+    # ties share the rank
+    assert save('dave', 100)[0]['rank'] == 3
+    assert save('bob', 50)[0]['rank'] == 3
+    assert save('bob', 175)[0]['rank'] == 2
+
+
+def test_score_stats_follow_every_save(app):
+    for nickname, total_score in [('alice', 100), ('bob', 30), ('alice', 150), ('alice', 120), ('bob', 210)]:
+        save(nickname, total_score)
+
+    assert score_stats.player_count() == 2
+    assert score_stats.summary()['won'] == 1
+    assert_stats_match_rebuild()
+
+
+@requires_postgres
+@pytest.mark.parametrize('database_url', [POSTGRES_URL])
+def test_row_inserted_during_the_upsert(app):
+    # another worker inserts the row while our statement runs: the upsert must replace
+    # that row's values in score_stats, not treat it as missing
+    with db.engine.connect() as other:
+        other.execute(insert(GameResult.__table__).values(
+            nickname='alice', initial_years=50, final_years=60, total_score=100, actions_count=3,
+            status='lost', played_at=datetime.now(timezone.utc)
+        ))
+
+        results = []
+        saving = threading.Thread(target=lambda: results.append(_save_in_context(app, 'alice', 150)))
+        saving.start()
+        time.sleep(0.5)  # blocks on the uncommitted row
+        other.commit()
+        score_stats.add(100, 10, 3, 'lost')  # what the other worker does after committing
+        saving.join()
+
+    body, status_code = results[0]
+    assert status_code == 200
+    assert body['improved'] is True
+    assert GameResult.query.filter_by(nickname='alice').one().total_score == 150
+    assert_stats_match_rebuild()
+
+
+def _save_in_context(app, nickname, total_score):
+    with app.app_context():
+        return save(nickname, total_score)